@@ -1,18 +1,37 @@
+import logging
+import os
+import queue
+import threading
 import tkinter as tk
-from tkinter import messagebox
-import random
-import time
+from tkinter import filedialog, messagebox
+
+from renju import RenjuEngine
+from renju.record import GameRecord, load_records, save_records
+
+# AI が読みに使うプロセス数（RENJU_WORKERS=4 python gomokunarabe.py など）
+AI_WORKERS = int(os.environ.get("RENJU_WORKERS", "1"))
+# AI の1手の持ち時間（秒）
+AI_TIME = 2.0
+# 人の手番のあいだに人の手を予想して読んでおく（RENJU_PONDER=0 で止める）
+PONDER = os.environ.get("RENJU_PONDER", "1") != "0"
+# 人が長く考えていても、先読みはこの秒数で打ち切る
+PONDER_TIME = 60.0
+
+
+def create_engine():
+    engine = RenjuEngine(workers=AI_WORKERS)
+    # RENJU_LOG=INFO 以下なら1手ごとの探索の統計もログに出す
+    if logging.getLogger("renju").isEnabledFor(logging.INFO):
+        engine.enable_stats()
+    return engine
 
 
 class RenjuApp:
     def __init__(self, root):
         self.root = root
         self.root.title("連珠 - 19x19 (強化AI)")
-        self.board_size = 19
-        self.board = [
-            [0] * self.board_size for _ in range(self.board_size)
-        ]  # 0:空, 1:黒, 2:白
-        self.current_player = 1
+        self.engine = create_engine()
+        self.board_size = self.engine.board_size
         self.cell_size = 25
         self.canvas = tk.Canvas(
             root,
@@ -21,9 +40,27 @@ class RenjuApp:
         )
         self.canvas.pack(padx=10, pady=10)
         self.draw_board()
+        self.create_stones()
         self.canvas.bind("<Button-1>", self.place_stone)
-        self.game_over = False
-        self.last_move = None
+        self.status = tk.Label(root, text="")
+        self.status.pack()
+        buttons = tk.Frame(root)
+        buttons.pack(pady=(0, 10))
+        tk.Button(buttons, text="新しい対局", command=self.new_game).pack(side=tk.LEFT)
+        tk.Button(buttons, text="棋譜を保存", command=self.save_record).pack(
+            side=tk.LEFT, padx=5
+        )
+        tk.Button(buttons, text="棋譜を開く", command=self.load_record).pack(
+            side=tk.LEFT
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # AI の探索は別スレッドで行い、結果はキュー経由で受け取る
+        self.search_queue = queue.Queue()
+        self.search_id = 0
+        self.stop_event = None
+        # 先読み中なら予想した人の手と、読み終えていればそのときの AI の手
+        self.ponder_move = None
+        self.ponder_result = None
 
     def draw_board(self):
         for i in range(self.board_size):
@@ -48,25 +85,57 @@ class RenjuApp:
                 fill="black",
             )
 
+    def create_stones(self):
+        # 石はマスごとに最初に作って隠しておき、打つたびに色と表示だけを変える
+        r = 10
+        self.stone_items = []
+        for x in range(self.board_size):
+            for y in range(self.board_size):
+                cx = 10 + x * self.cell_size
+                cy = 10 + y * self.cell_size
+                self.stone_items.append(
+                    self.canvas.create_oval(
+                        cx - r, cy - r, cx + r, cy + r, state=tk.HIDDEN
+                    )
+                )
+        # 最後の手の印。石の上に重ねて動かす
+        self.last_move_item = self.canvas.create_oval(
+            0, 0, 0, 0, fill="red", outline="", state=tk.HIDDEN
+        )
+
+    def clear_stones(self):
+        for item in self.stone_items:
+            self.canvas.itemconfig(item, state=tk.HIDDEN)
+        self.canvas.itemconfig(self.last_move_item, state=tk.HIDDEN)
+
     def place_stone(self, event):
-        if self.game_over or self.current_player == 2:
+        if self.engine.game_over or self.engine.current_player == 2:
             return
         x = round((event.x - 10) / self.cell_size)
         y = round((event.y - 10) / self.cell_size)
         if self.is_valid_move(x, y):
-            self.make_move(x, y, self.current_player)
-            self.last_move = (x, y)
-            if not self.game_over:
+            hit = self.ponder_move == (x, y)
+            self.ponder_move = None
+            if not hit:
+                self.cancel_search()
+            self.make_move(x, y, self.engine.current_player)
+            if self.engine.game_over:
+                self.cancel_search()
+            elif not hit:
                 self.root.after(500, self.computer_move)
+            elif self.ponder_result is not None:
+                # 先読みが読み終えていた手をそのまま打つ
+                move = self.ponder_result
+                self.root.after(500, lambda: self.play_computer_move(move))
+            else:
+                # 予想が当たったので、読んでいる探索をあと AI_TIME 秒続けさせる
+                self.status.config(text="考え中...")
+                self.root.after(int(AI_TIME * 1000), self.stop_event.set)
 
     def is_valid_move(self, x, y):
-        if not (
-            0 <= x < self.board_size
-            and 0 <= y < self.board_size
-            and self.board[x][y] == 0
-        ):
+        if not self.engine.is_empty(x, y):
             return False
-        if self.current_player == 1 and self.is_forbidden_move(x, y):
+        if self.engine.current_player == 1 and self.engine.is_forbidden_move(x, y):
             messagebox.showwarning(
                 "禁じ手", "黒は三三、四四、六連以上の手を打てません！"
             )
@@ -74,738 +143,170 @@ class RenjuApp:
         return True
 
     def make_move(self, x, y, player):
-        self.board[x][y] = player
-        color = "black" if player == 1 else "white"
-        self.canvas.create_oval(
-            10 + x * self.cell_size - 10,
-            10 + y * self.cell_size - 10,
-            10 + x * self.cell_size + 10,
-            10 + y * self.cell_size + 10,
-            fill=color,
-        )
-        if self.check_winner(x, y):
+        result = self.engine.make_move(x, y, player)
+        self.draw_stone(x, y, player)
+        if result == "win":
             messagebox.showinfo(
                 "勝利", f"{'黒' if player == 1 else '白'} が勝ちました！"
             )
-            self.game_over = True
-        elif all(
-            self.board[i][j] != 0
-            for i in range(self.board_size)
-            for j in range(self.board_size)
-        ):
+        elif result == "draw":
             messagebox.showinfo("終了", "引き分けです！")
-            self.game_over = True
-        else:
-            self.current_player = 3 - player
-
-    def check_winner(self, x, y):
-        player = self.board[x][y]
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            count = 1
-            positions = [(x, y)]
-            # 右側をチェック
-            i, j = x + dx, y + dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == player
-            ):
-                count += 1
-                positions.append((i, j))
-                i += dx
-                j += dy
-            # 左側をチェック
-            i, j = x - dx, y - dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == player
-            ):
-                count += 1
-                positions.insert(0, (i, j))  # 左側は先頭に追加
-                i -= dx
-                j -= dy
-            if count == 5:  # 厳密に5連続のみ
-                print(
-                    f"Winner detected: Player {player} with line {positions} (count: {count})"
-                )
-                return True
-        return False
-
-    def is_forbidden_move(self, x, y):
-        self.board[x][y] = 1
-        forbidden = (
-            self.check_three_three(x, y)
-            or self.check_four_four(x, y)
-            or self.check_overline(x, y)
-        )
-        self.board[x][y] = 0
-        return forbidden
-
-    def check_three_three(self, x, y):
-        threes = 0
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            if self.count_open_three(x, y, dx, dy, 1):
-                threes += 1
-                print(
-                    f"Open three detected in direction ({dx}, {dy}) at {x},{y}: {self.get_three_positions(x, y, dx, dy)}"
-                )
-        return threes >= 2
 
-    def check_four_four(self, x, y):
-        fours = 0
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            if self.count_open_four(x, y, dx, dy, 1):
-                fours += 1
-        return fours >= 2
-
-    def check_overline(self, x, y):
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        for dx, dy in directions:
-            count = 1
-            i, j = x + dx, y + dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == 1
-            ):
-                count += 1
-                i += dx
-                j += dy
-            i, j = x - dx, y - dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == 1
-            ):
-                count += 1
-                i -= dx
-                j += dy
-            if count > 5:
-                return True
-        return False
-
-    def count_open_three(self, x, y, dx, dy, player):
-        positions = [(x, y)]
-        i, j = x + dx, y + dy
-        while (
-            0 <= i < self.board_size
-            and 0 <= j < self.board_size
-            and self.board[i][j] == player
-        ):
-            positions.append((i, j))
-            i += dx
-            j += dy
-        before_x, before_y = x - dx, y - dy
-        after_x, after_y = i, j
-        # 両端が空いている場合にのみ活三と判定
-        if (
-            len(positions) == 3
-            and (
-                0 <= before_x < self.board_size
-                and 0 <= before_y < self.board_size
-                and self.board[before_x][before_y] == 0
-            )
-            and (
-                0 <= after_x < self.board_size
-                and 0 <= after_y < self.board_size
-                and self.board[after_x][after_y] == 0
-            )
-        ):
-            return True
-        return False
-
-    def get_three_positions(self, x, y, dx, dy):
-        positions = [(x, y)]
-        i, j = x + dx, y + dy
-        while (
-            0 <= i < self.board_size
-            and 0 <= j < self.board_size
-            and self.board[i][j] == 1
-        ):
-            positions.append((i, j))
-            i += dx
-            j += dy
-        i, j = x - dx, y - dy
-        while (
-            0 <= i < self.board_size
-            and 0 <= j < self.board_size
-            and self.board[i][j] == 1
-        ):
-            positions.insert(0, (i, j))
-            i -= dx
-            j -= dy
-        return positions[:3]  # 3つまで
-
-    def count_open_four(self, x, y, dx, dy, player):
-        positions = [(x, y)]
-        i, j = x + dx, y + dy
-        while (
-            0 <= i < self.board_size
-            and 0 <= j < self.board_size
-            and self.board[i][j] == player
-        ):
-            positions.append((i, j))
-            i += dx
-            j += dy
-        before_x, before_y = x - dx, y - dy
-        after_x, after_y = i, j
-        open_ends = 0
-        if (
-            0 <= before_x < self.board_size
-            and 0 <= before_y < self.board_size
-            and self.board[before_x][before_y] == 0
-        ):
-            open_ends += 1
-        if (
-            0 <= after_x < self.board_size
-            and 0 <= after_y < self.board_size
-            and self.board[after_x][after_y] == 0
-        ):
-            open_ends += 1
-        if len(positions) == 4 and open_ends > 0:
-            return True
-        return False
-
-    def count_jump_three(self, x, y, dx, dy, player):
-        positions = [(x, y)]
-        i, j = x + dx, y + dy
-        gap_count = 0
-        while 0 <= i < self.board_size and 0 <= j < self.board_size:
-            if self.board[i][j] == player:
-                positions.append((i, j))
-            elif self.board[i][j] == 0 and gap_count == 0:
-                gap_count += 1
-                gap_x, gap_y = i, j
-            else:
-                break
-            i += dx
-            j += dy
-        before_x, before_y = x - dx, y - dy
-        after_x, after_y = i, j
-        if (
-            len(positions) == 3
-            and gap_count == 1
-            and (
-                0 <= before_x < self.board_size
-                and 0 <= before_y < self.board_size
-                and self.board[before_x][before_y] == 0
-                or 0 <= after_x < self.board_size
-                and 0 <= after_y < self.board_size
-                and self.board[after_x][after_y] == 0
-            )
-        ):
-            return (True, gap_x, gap_y)
-        return (False, None, None)
-
-    def count_jump_four(self, x, y, dx, dy, player):
-        positions = [(x, y)]
-        i, j = x + dx, y + dy
-        gap_count = 0
-        gap_x, gap_y = None, None
-        while 0 <= i < self.board_size and 0 <= j < self.board_size:
-            if self.board[i][j] == player:
-                positions.append((i, j))
-            elif self.board[i][j] == 0 and gap_count == 0:
-                gap_count += 1
-                gap_x, gap_y = i, j
-            else:
-                break
-            i += dx
-            j += dy
-        before_x, before_y = x - dx, y - dy
-        after_x, after_y = i, j
-        if (
-            len(positions) == 4
-            and gap_count == 1
-            and (
-                0 <= before_x < self.board_size
-                and 0 <= before_y < self.board_size
-                and self.board[before_x][before_y] == 0
-                or 0 <= after_x < self.board_size
-                and 0 <= after_y < self.board_size
-                and self.board[after_x][after_y] == 0
-            )
-        ):
-            return (True, gap_x, gap_y)
-        if len(positions) >= 2:
-            second_x, second_y = positions[1]
-            if (
-                0 <= second_x + dx < self.board_size
-                and 0 <= second_y + dy < self.board_size
-                and self.board[second_x + dx][second_y + dy] == 0
-                and 0 <= second_x + 2 * dx < self.board_size
-                and 0 <= second_y + 2 * dy < self.board_size
-                and self.board[second_x + 2 * dx][second_y + 2 * dy] == player
-                and 0 <= second_x + 3 * dx < self.board_size
-                and 0 <= second_y + 3 * dy < self.board_size
-                and self.board[second_x + 3 * dx][second_y + 3 * dy] == player
-            ):
-                gap_x, gap_y = second_x + dx, second_y + dy
-                positions = [
-                    (x, y),
-                    (second_x, second_y),
-                    (second_x + 2 * dx, second_y + 2 * dy),
-                    (second_x + 3 * dx, second_y + 3 * dy),
-                ]
-                before_open = (
-                    0 <= before_x < self.board_size
-                    and 0 <= before_y < self.board_size
-                    and self.board[before_x][before_y] == 0
-                )
-                after_open = (
-                    0 <= second_x + 4 * dx < self.board_size
-                    and 0 <= second_y + 4 * dy < self.board_size
-                    and self.board[second_x + 4 * dx][second_y + 4 * dy] == 0
-                )
-                if before_open or after_open:
-                    return (True, gap_x, gap_y)
-        return (False, None, None)
-
-    def evaluate_position(self, x, y, player):
-        score = 0
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        self.board[x][y] = player
-        opponent = 3 - player
-
-        for dx, dy in directions:
-            count = 1
-            open_ends = 0
-            i, j = x + dx, y + dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == player
-            ):
-                count += 1
-                i += dx
-                j += dy
-            after_open = (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == 0
-            )
-            if after_open:
-                open_ends += 1
-            i, j = x - dx, y - dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == player
-            ):
-                count += 1
-                i -= dx
-                j += dy
-            before_open = (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == 0
-            )
-            if before_open:
-                open_ends += 1
+    def draw_stone(self, x, y, player):
+        color = "black" if player == 1 else "white"
+        item = self.stone_items[x * self.board_size + y]
+        self.canvas.itemconfig(item, fill=color, state=tk.NORMAL)
+        cx = 10 + x * self.cell_size
+        cy = 10 + y * self.cell_size
+        self.canvas.coords(self.last_move_item, cx - 3, cy - 3, cx + 3, cy + 3)
+        self.canvas.itemconfig(self.last_move_item, state=tk.NORMAL)
 
-            if count >= 5:
-                score += 100000 if player == 2 else -100000
-            elif count == 4 and open_ends == 2:
-                score += 30000 if player == 2 else -25000
-            elif count == 4 and open_ends == 1:
-                score += 15000 if player == 2 else -15000
-            elif count == 3 and open_ends == 2:
-                score += 8000 if player == 2 else -7000
-            elif count == 3 and open_ends == 1:
-                score += 2000 if player == 2 else -1500
-            elif count == 2 and open_ends == 2:
-                score += 500 if player == 2 else -300
+    def computer_move(self):
+        if self.engine.game_over or self.engine.current_player != 2:
+            return
+        self.start_search(self.engine.copy(), AI_TIME)
+        self.status.config(text="考え中...")
 
-            jump_three, _, _ = self.count_jump_three(x, y, dx, dy, player)
-            if jump_three:
-                score += 6000 if player == 2 else -4000
-            jump_four, _, _ = self.count_jump_four(x, y, dx, dy, player)
-            if jump_four:
-                score += 20000 if player == 2 else -20000
+    def play_computer_move(self, move):
+        if self.engine.game_over or self.engine.current_player != 2:
+            return
+        self.make_move(*move, 2)
+        self.start_ponder()
 
-            count = 0
-            open_ends = 0
-            i, j = x + dx, y + dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == opponent
-            ):
-                count += 1
-                i += dx
-                j += dy
-            after_open = (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == 0
-            )
-            if after_open:
-                open_ends += 1
-            i, j = x - dx, y - dy
-            while (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == opponent
-            ):
-                count += 1
-                i -= dx
-                j += dy
-            before_open = (
-                0 <= i < self.board_size
-                and 0 <= j < self.board_size
-                and self.board[i][j] == 0
+    def start_ponder(self):
+        # 人の手番のあいだ、予想した人の手を打った局面を読んで置換表を埋めておく
+        if not PONDER or self.engine.game_over:
+            return
+        move = self.engine.predicted_reply()
+        if move is None:
+            return
+        # 並列探索のワーカーは使わず、このプロセスの中だけで読む
+        engine = self.engine.copy(workers=1)
+        if engine.make_move(*move) is not None:
+            return
+        self.start_search(engine, PONDER_TIME)
+        self.ponder_move = move
+        self.ponder_result = None
+
+    def start_search(self, engine, time_limit):
+        self.cancel_search()
+        self.stop_event = threading.Event()
+        threading.Thread(
+            target=self.run_search,
+            args=(engine, self.stop_event, self.search_id, time_limit),
+            daemon=True,
+        ).start()
+        self.root.after(50, self.poll_search)
+
+    def run_search(self, engine, stop_event, search_id, time_limit):
+        # 探索スレッド側。Tk には触らずキューに結果を積む
+        def report(info):
+            self.search_queue.put((search_id, "progress", info))
+
+        try:
+            move = engine.best_move(
+                time_limit=time_limit, stop_event=stop_event, on_progress=report
             )
-            if before_open:
-                open_ends += 1
-            if count == 4 and open_ends >= 1:
-                score += 60000
-            elif count == 3 and open_ends == 2:
-                score += 30000
-            elif count == 3 and open_ends == 1:
-                score += 8000
-            elif count == 2 and open_ends == 2:
-                score += 500
-
-            jump_three, _, _ = self.count_jump_three(x, y, dx, dy, opponent)
-            if jump_three:
-                score += 15000
-            jump_four, _, _ = self.count_jump_four(x, y, dx, dy, opponent)
-            if jump_four:
-                score += 50000
-
-        self.board[x][y] = 0
-        return score
-
-    def check_immediate_threats(self):
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        cells = self.get_all_empty_cells()
-        # 白の勝利をチェック（5連続のみ）
-        for x, y in cells:
-            self.board[x][y] = 2
-            if self.check_winner(x, y):
-                self.board[x][y] = 0
-                print(f"White wins at {x},{y}")
-                return (x, y)
-            self.board[x][y] = 0
-
-        # 白の活四をチェック（防御優先）
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.board[x][y] == 2:
-                    for dx, dy in directions:
-                        positions = [(x, y)]
-                        i, j = x + dx, y + dy
-                        while (
-                            0 <= i < self.board_size
-                            and 0 <= j < self.board_size
-                            and self.board[i][j] == 2
-                        ):
-                            positions.append((i, j))
-                            i += dx
-                            j += dy
-                        before_x, before_y = x - dx, y - dy
-                        after_x, after_y = i, j
-                        if len(positions) == 4 and (
-                            (
-                                0 <= before_x < self.board_size
-                                and 0 <= before_y < self.board_size
-                                and self.board[before_x][before_y] == 0
-                            )
-                            or (
-                                0 <= after_x < self.board_size
-                                and 0 <= after_y < self.board_size
-                                and self.board[after_x][after_y] == 0
-                            )
-                        ):
-                            if (
-                                0 <= before_x < self.board_size
-                                and 0 <= before_y < self.board_size
-                                and self.board[before_x][before_y] == 0
-                            ):
-                                print(
-                                    f"Detected white open four: {positions}, blocking at {before_x},{before_y}"
-                                )
-                                return (before_x, before_y)
-                            elif (
-                                0 <= after_x < self.board_size
-                                and 0 <= after_y < self.board_size
-                                and self.board[after_x][after_y] == 0
-                            ):
-                                print(
-                                    f"Detected white open four: {positions}, blocking at {after_x},{after_y}"
-                                )
-                                return (after_x, after_y)
-
-        # 黒の飛び四をチェック
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.board[x][y] == 1:
-                    for dx, dy in directions:
-                        jump_four, gap_x, gap_y = self.count_jump_four(x, y, dx, dy, 1)
-                        if jump_four:
-                            positions = [(x, y)]
-                            i, j = x + dx, y + dy
-                            while (
-                                0 <= i < self.board_size
-                                and 0 <= j < self.board_size
-                                and (
-                                    self.board[i][j] == 1 or (i == gap_x and j == gap_y)
-                                )
-                            ):
-                                if self.board[i][j] == 1:
-                                    positions.append((i, j))
-                                i += dx
-                                j += dy
-                            print(
-                                f"Detected black jump four: {positions}, blocking at {gap_x},{gap_y}"
-                            )
-                            return (gap_x, gap_y)
-
-        # 黒の四をチェック
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.board[x][y] == 1:
-                    for dx, dy in directions:
-                        positions = [(x, y)]
-                        i, j = x + dx, y + dy
-                        while (
-                            0 <= i < self.board_size
-                            and 0 <= j < self.board_size
-                            and self.board[i][j] == 1
-                        ):
-                            positions.append((i, j))
-                            i += dx
-                            j += dy
-                        before_x, before_y = x - dx, y - dy
-                        after_x, after_y = i, j
-                        before_open = (
-                            0 <= before_x < self.board_size
-                            and 0 <= before_y < self.board_size
-                            and self.board[before_x][before_y] == 0
-                        )
-                        after_open = (
-                            0 <= after_x < self.board_size
-                            and 0 <= after_y < self.board_size
-                            and self.board[after_x][after_y] == 0
-                        )
-                        open_ends = (1 if before_open else 0) + (1 if after_open else 0)
-                        if len(positions) == 4 and open_ends > 0:
-                            if open_ends == 2:
-                                print(
-                                    f"Detected black open four: {positions}, blocking at {before_x},{before_y}"
-                                )
-                                return (before_x, before_y)
-                            elif before_open:
-                                print(
-                                    f"Detected black four: {positions}, blocking at {before_x},{before_y}"
-                                )
-                                return (before_x, before_y)
-                            elif after_open:
-                                print(
-                                    f"Detected black four: {positions}, blocking at {after_x},{after_y}"
-                                )
-                                return (after_x, after_y)
-
-        # 黒の活三をチェック
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.board[x][y] == 1:
-                    for dx, dy in directions:
-                        positions = [(x, y)]
-                        i, j = x + dx, y + dy
-                        while (
-                            0 <= i < self.board_size
-                            and 0 <= j < self.board_size
-                            and self.board[i][j] == 1
-                        ):
-                            positions.append((i, j))
-                            i += dx
-                            j += dy
-                        before_x, before_y = x - dx, y - dy
-                        after_x, after_y = i, j
-                        if len(positions) == 3 and (
-                            0 <= before_x < self.board_size
-                            and 0 <= before_y < self.board_size
-                            and self.board[before_x][before_y] == 0
-                            and 0 <= after_x < self.board_size
-                            and 0 <= after_y < self.board_size
-                            and self.board[after_x][after_y] == 0
-                        ):
-                            print(
-                                f"Detected black open three: {positions}, blocking at {before_x},{before_y}"
-                            )
-                            return (before_x, before_y)
+        except Exception as error:
+            # 定石ファイルや並列探索のワーカーの不具合。UI 側で知らせる
+            logging.exception("search failed")
+            self.search_queue.put((search_id, "error", error))
+            return
+        self.search_queue.put((search_id, "done", move))
 
-        # 黒の飛び三をチェック
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.board[x][y] == 1:
-                    for dx, dy in directions:
-                        jump_three, gap_x, gap_y = self.count_jump_three(
-                            x, y, dx, dy, 1
+    def poll_search(self):
+        if self.stop_event is None:
+            return
+        try:
+            while True:
+                search_id, kind, value = self.search_queue.get_nowait()
+                if search_id != self.search_id:
+                    continue  # 取り消した探索の結果は捨てる
+                if kind == "progress":
+                    if self.ponder_move is None:
+                        self.status.config(
+                            text=f"考え中... 深さ {value['depth']}"
+                            f"（{value['nodes']} 局面）"
                         )
-                        if jump_three:
-                            positions = [(x, y)]
-                            i, j = x + dx, y + dy
-                            while (
-                                0 <= i < self.board_size
-                                and 0 <= j < self.board_size
-                                and (
-                                    self.board[i][j] == 1 or (i == gap_x and j == gap_y)
-                                )
-                            ):
-                                if self.board[i][j] == 1:
-                                    positions.append((i, j))
-                                i += dx
-                                j += dy
-                            print(
-                                f"Detected black jump three: {positions}, blocking at {gap_x},{gap_y}"
-                            )
-                            return (gap_x, gap_y)
-
-        # 黒の勝利をブロック
-        for x, y in cells:
-            self.board[x][y] = 1
-            if self.check_winner(x, y) and not self.is_forbidden_move(x, y):
-                self.board[x][y] = 0
-                print(f"Block black win at {x},{y}")
-                return (x, y)
-            self.board[x][y] = 0
-
-        return None
-
-    def get_all_empty_cells(self):
-        return [
-            (i, j)
-            for i in range(self.board_size)
-            for j in range(self.board_size)
-            if self.board[i][j] == 0
-        ]
-
-    def minimax(self, depth, alpha, beta, maximizing_player, deadline):
-        if depth == 0 or self.game_over or time.time() > deadline:
-            return self.evaluate_board()
-
-        empty_cells = self.get_relevant_cells()
-        if not empty_cells:
-            return 0
-
-        if maximizing_player:
-            max_eval = float("-inf")
-            for x, y in empty_cells:
-                self.board[x][y] = 2
-                eval = self.minimax(depth - 1, alpha, beta, False, deadline)
-                self.board[x][y] = 0
-                max_eval = max(max_eval, eval)
-                alpha = max(alpha, eval)
-                if beta <= alpha:
-                    break
-            return max_eval
-        else:
-            min_eval = float("inf")
-            for x, y in empty_cells:
-                if not self.is_forbidden_move(x, y):
-                    self.board[x][y] = 1
-                    eval = self.minimax(depth - 1, alpha, beta, True, deadline)
-                    self.board[x][y] = 0
-                    min_eval = min(min_eval, eval)
-                    beta = min(beta, eval)
-                    if beta <= alpha:
-                        break
-            return min_eval
-
-    def evaluate_board(self):
-        score = 0
-        for x, y in self.get_relevant_cells():
-            score += self.evaluate_position(x, y, 2)
-            score -= self.evaluate_position(x, y, 1)
-        return score
-
-    def get_relevant_cells(self):
-        if not self.last_move:
-            return [(9, 9)]
-        x, y = self.last_move
-        cells = []
-        for i in range(max(0, x - 4), min(self.board_size, x + 5)):
-            for j in range(max(0, y - 4), min(self.board_size, y + 5)):
-                if self.board[i][j] == 0:
-                    cells.append((i, j))
-        cells.sort(
-            key=lambda pos: self.evaluate_position(pos[0], pos[1], 2), reverse=True
+                elif kind == "error":
+                    self.stop_event = None
+                    if self.ponder_move is not None:
+                        # 先読みの失敗は黙って諦め、人が打ったら読み直す
+                        self.ponder_move = None
+                        return
+                    self.status.config(text="")
+                    messagebox.showerror("探索", f"AI の読みに失敗しました: {value}")
+                    return
+                elif self.ponder_move is not None:
+                    # 人がまだ打っていない。当たったときのために手を取っておく
+                    self.stop_event = None
+                    self.ponder_result = value
+                    return
+                else:
+                    self.stop_event = None
+                    self.status.config(text="")
+                    self.play_computer_move(value)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(50, self.poll_search)
+
+    def cancel_search(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+            self.stop_event = None
+        self.search_id += 1
+        self.ponder_move = None
+        self.ponder_result = None
+        self.status.config(text="")
+
+    def new_game(self):
+        self.cancel_search()
+        parallel = self.engine.parallel
+        self.engine = create_engine()
+        self.engine.parallel = parallel  # ワーカープロセスは使い回す
+        self.clear_stones()
+
+    def save_record(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".txt", filetypes=[("棋譜", "*.txt")]
         )
-        return cells[:20]
+        if path:
+            record = GameRecord.from_engine(self.engine, Black="Human", White="AI")
+            save_records(path, [record])
 
-    def computer_move(self):
-        if self.game_over:
+    def load_record(self):
+        path = filedialog.askopenfilename(filetypes=[("棋譜", "*.txt *.jsonl")])
+        if not path:
             return
-        # 初手: 黒の隣（8方向）に置く
-        black_stones = [
-            (i, j)
-            for i in range(self.board_size)
-            for j in range(self.board_size)
-            if self.board[i][j] == 1
-        ]
-        if len(black_stones) == 1:  # 黒が1手だけ置いた場合
-            x, y = black_stones[0]
-            adjacent = [
-                (x + 1, y),
-                (x - 1, y),
-                (x, y + 1),
-                (x, y - 1),  # 上下左右
-                (x + 1, y + 1),
-                (x + 1, y - 1),
-                (x - 1, y + 1),
-                (x - 1, y - 1),
-            ]  # 斜め
-            valid_adjacent = [
-                (adj_x, adj_y)
-                for adj_x, adj_y in adjacent
-                if 0 <= adj_x < self.board_size
-                and 0 <= adj_y < self.board_size
-                and self.board[adj_x][adj_y] == 0
-            ]
-            if valid_adjacent:
-                adj_x, adj_y = random.choice(valid_adjacent)
-                self.make_move(adj_x, adj_y, 2)
-                return
-
-        start_time = time.time()
-        deadline = start_time + 2.0
-
-        immediate_move = self.check_immediate_threats()
-        if immediate_move:
-            x, y = immediate_move
-            self.make_move(x, y, 2)
+        try:
+            records = load_records(path)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("棋譜", f"棋譜を読めませんでした: {error}")
             return
+        if not records:
+            return
+        # 複数局あるファイルは最初の1局を並べる
+        self.new_game()
+        try:
+            engine = records[0].replay(self.engine)
+        except ValueError as error:
+            self.new_game()
+            messagebox.showerror("棋譜", f"棋譜を並べられませんでした: {error}")
+            return
+        for x, y, player, _ in engine.history:
+            self.draw_stone(x, y, player)
+        if not engine.game_over and engine.current_player == 2:
+            self.root.after(500, self.computer_move)
 
-        best_score = float("-inf")
-        best_move = None
-        depth = 4  # 深さを4に増加
-
-        cells = self.get_relevant_cells()
-        for x, y in cells:
-            self.board[x][y] = 2
-            score = self.minimax(depth, float("-inf"), float("inf"), False, deadline)
-            self.board[x][y] = 0
-            if score > best_score:
-                best_score = score
-                best_move = (x, y)
-            if time.time() > deadline:
-                break
-
-        if best_move:
-            x, y = best_move
-        else:
-            empty_cells = self.get_all_empty_cells()
-            x, y = random.choice(empty_cells)
-        self.make_move(x, y, 2)
+    def on_close(self):
+        self.cancel_search()
+        self.engine.close()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("RENJU_LOG", "WARNING").upper())
     root = tk.Tk()
     app = RenjuApp(root)
     root.mainloop()
@@ -0,0 +1,3 @@
+from .engine import BLACK, EMPTY, WHITE, RenjuEngine
+
+__all__ = ["BLACK", "EMPTY", "WHITE", "RenjuEngine"]
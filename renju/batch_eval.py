@@ -0,0 +1,141 @@
+"""NumPy で多数の盤面をまとめて評価する（NumPy がある場合のみ）。
+
+盤面は (N, 19, 19) の int8 配列（0 空 / 1 黒 / 2 白）で表す。周りを壁で
+埋めてから、4方向それぞれについて中心から ±5 マスをずらした配列を
+3進数の重みで足し合わせ（窓の畳み込み）、patterns の表を配列ごと引いて
+全マス・全方向の形の種類を一度に求める。
+
+evaluate_positions は RenjuEngine.evaluate_position と、evaluate_boards は
+IncrementalEvaluator.score と同じ値を返す。
+
+    python -m renju.batch_eval --boards 2000
+"""
+
+import argparse
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy がなければこのモジュールの関数は使えない
+    np = None
+
+from .board import BLACK, DIRECTIONS, EMPTY, WHITE, WINDOW
+from .evaluation import DEFAULT_WEIGHTS
+from .patterns import PATTERNS
+
+WALL = 3
+# 窓の中心からの位置 k（-WINDOW..WINDOW、0 以外）ごとの3進数の桁の重み
+DIGIT_WEIGHTS = [
+    (k, 3 ** (k + WINDOW if k < 0 else k + WINDOW - 1))
+    for k in range(-WINDOW, WINDOW + 1)
+    if k != 0
+]
+
+_class_table = None
+
+
+def _classes():
+    global _class_table
+    if np is None:
+        raise ImportError("renju.batch_eval には NumPy が必要です")
+    if _class_table is None:
+        _class_table = np.array([entry[0] for entry in PATTERNS], dtype=np.int8)
+    return _class_table
+
+
+def board_array(board):
+    # BitBoard を (size, size) の int8 配列に
+    _classes()
+    return np.array(board.cells, dtype=np.int8).reshape(board.size, board.size)
+
+
+def pattern_classes(boards, player):
+    # 各マスに player が打ったときの方向ごとの形の種類。形は (N, 4, size, size)
+    table = _classes()
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    count, size, _ = boards.shape
+    padded = np.full((count, size + 2 * WINDOW, size + 2 * WINDOW), WALL, np.int8)
+    padded[:, WINDOW:-WINDOW, WINDOW:-WINDOW] = boards
+    # 0 空 / 1 自石 / 2 塞がり（相手の石と壁）
+    digits = np.where(padded == player, 1, np.where(padded == EMPTY, 0, 2))
+    digits = digits.astype(np.int32)
+    classes = np.empty((count, 4, size, size), np.int8)
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        index = np.zeros((count, size, size), np.int32)
+        for k, weight in DIGIT_WEIGHTS:
+            x = WINDOW + k * dx
+            y = WINDOW + k * dy
+            index += weight * digits[:, x : x + size, y : y + size]
+        classes[:, d] = table[index]
+    return classes
+
+
+def _weights(weights):
+    weights = weights or DEFAULT_WEIGHTS
+    return (
+        {
+            BLACK: np.array(weights["attack_black"], dtype=np.int64),
+            WHITE: np.array(weights["attack_white"], dtype=np.int64),
+        },
+        np.array(weights["block"], dtype=np.int64),
+    )
+
+
+def evaluate_positions(boards, player, weights=None):
+    # 空きマスごとの evaluate_position(x, y, player) の値。石のあるマスは 0
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    attack, block = _weights(weights)
+    sign = 1 if player == WHITE else -1
+    own = pattern_classes(boards, player)
+    other = pattern_classes(boards, 3 - player)
+    scores = (sign * attack[player][own] + block[other]).sum(axis=1)
+    return np.where(boards == EMPTY, scores, 0)
+
+
+def evaluate_boards(boards, weights=None):
+    # 盤面ごとの評価値（白から見た値）。IncrementalEvaluator.score と同じ
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    attack, _ = _weights(weights)
+    white = attack[WHITE][pattern_classes(boards, WHITE)].sum(axis=1)
+    black = attack[BLACK][pattern_classes(boards, BLACK)].sum(axis=1)
+    return np.where(boards == EMPTY, white - black, 0).sum(axis=(1, 2))
+
+
+def main(argv=None):
+    from .engine import RenjuEngine
+
+    parser = argparse.ArgumentParser(description="まとめて評価する速さと値を確かめる")
+    parser.add_argument("--boards", type=int, default=1000, help="評価する盤面の数")
+    parser.add_argument("--stones", type=int, default=30, help="1盤面の石の数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    engines = []
+    for _ in range(args.boards):
+        engine = RenjuEngine()
+        cells = rng.sample(range(engine.board_size**2), args.stones)
+        for i, cell in enumerate(cells):
+            x, y = divmod(cell, engine.board_size)
+            engine.play(x, y, BLACK if i % 2 == 0 else WHITE)
+        engines.append(engine)
+    boards = np.stack([board_array(engine.board) for engine in engines])
+    start = time.perf_counter()
+    scores = evaluate_boards(boards)
+    elapsed = time.perf_counter() - start
+    expected = np.array([engine.evaluator.score for engine in engines])
+    mismatches = int((scores != expected).sum())
+    print(
+        f"{args.boards} boards in {elapsed:.3f}s "
+        f"({args.boards / elapsed:.0f} boards/s), {mismatches} mismatches"
+    )
+
+
+if __name__ == "__main__":
+    main()
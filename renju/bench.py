@@ -0,0 +1,224 @@
+"""固定局面集によるエンジンのベンチマーク。
+
+bench_positions.json の局面（序盤・中盤・答えの分かっている詰め問題）を
+1つずつ新しいエンジンで読ませ、局面ごとに nodes/s・各深さに達した時間・
+正解に達した時間と正解かどうかを測る。結果は JSON で保存でき、2回分の
+結果を比べて遅くなった・解けなくなった局面を報告する。
+
+    python -m renju.bench --output before.json
+    python -m renju.bench --output after.json
+    python -m renju.bench --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from .engine import RenjuEngine
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "bench_positions.json")
+# compare でこれ以上 nodes/s が落ちたら退行とみなす割合
+NPS_TOLERANCE = 0.10
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def setup_position(position):
+    # 黒・白の石を交互に置く。黒が白より1つ多ければ白番
+    engine = RenjuEngine()
+    engine.book = None  # 探索の速さを測るので定石は引かない
+    black = [tuple(move) for move in position["black"]]
+    white = [tuple(move) for move in position["white"]]
+    for i in range(len(black)):
+        engine.make_move(*black[i], 1)
+        if i < len(white):
+            engine.make_move(*white[i], 2)
+    return engine
+
+
+def run_position(position, time_limit=2.0, max_nodes=None, max_depth=20, seed=0):
+    random.seed(seed)  # 序盤の乱択を固定する
+    engine = setup_position(position)
+    answers = {tuple(move) for move in position.get("answers", ())}
+    avoid = {tuple(move) for move in position.get("avoid", ())}
+
+    def is_correct(move):
+        if answers:
+            return move in answers
+        return move not in avoid
+
+    time_to_depth = {}
+    progress = []
+    start = time.perf_counter()
+
+    def report(info):
+        elapsed = time.perf_counter() - start
+        time_to_depth[info["depth"]] = elapsed
+        progress.append((elapsed, info["move"]))
+
+    engine.search_info = None
+    move = engine.best_move(
+        time_limit=time_limit,
+        max_nodes=max_nodes,
+        max_depth=max_depth,
+        on_progress=report,
+    )
+    elapsed = time.perf_counter() - start
+    info = engine.search_info or {"source": "immediate", "depth": 0, "nodes": 0}
+    result = {
+        "name": position["name"],
+        "category": position["category"],
+        "move": list(move),
+        "source": info["source"],
+        "depth": info["depth"],
+        "nodes": info["nodes"],
+        "time": elapsed,
+        "nps": info["nodes"] / elapsed if elapsed else 0.0,
+        "time_to_depth": {str(depth): t for depth, t in time_to_depth.items()},
+        "solved": None,
+        "time_to_solve": None,
+    }
+    if answers or avoid:
+        result["solved"] = is_correct(move)
+        if result["solved"]:
+            # 最後まで正解のままだった最初の深さの時刻。探索前に決まったなら全体の時間
+            solve_time = elapsed
+            for t, best in reversed(progress):
+                if not is_correct(best):
+                    break
+                solve_time = t
+            result["time_to_solve"] = solve_time
+    return result
+
+
+def summarize(results):
+    searched = [r for r in results if r["nodes"]]
+    puzzles = [r for r in results if r["solved"] is not None]
+    nodes = sum(r["nodes"] for r in searched)
+    seconds = sum(r["time"] for r in searched)
+    return {
+        "positions": len(results),
+        "nps": nodes / seconds if seconds else 0.0,
+        "mean_depth": (
+            sum(r["depth"] for r in searched) / len(searched) if searched else 0.0
+        ),
+        "solved": sum(1 for r in puzzles if r["solved"]),
+        "puzzles": len(puzzles),
+        "solve_rate": (
+            sum(1 for r in puzzles if r["solved"]) / len(puzzles) if puzzles else None
+        ),
+    }
+
+
+def run(
+    corpus, time_limit=2.0, max_nodes=None, max_depth=20, only=None, out=sys.stdout
+):
+    results = []
+    for position in corpus:
+        if only and position["name"] not in only:
+            continue
+        result = run_position(position, time_limit, max_nodes, max_depth)
+        results.append(result)
+        solved = {None: "-", True: "ok", False: "NG"}[result["solved"]]
+        print(
+            f"{result['name']:<20} {result['source']:<9} "
+            f"depth {result['depth']:2d}  {result['nps']:8.0f} nodes/s  "
+            f"{result['time']:6.2f}s  {solved}",
+            file=out,
+        )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time_limit": time_limit,
+            "max_nodes": max_nodes,
+            "max_depth": max_depth,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "positions": results,
+        "summary": summarize(results),
+    }
+
+
+def compare(old, new, tolerance=NPS_TOLERANCE, out=sys.stdout):
+    # 退行（遅くなった・浅くなった・解けなくなった）の説明の一覧を返す
+    regressions = []
+    before = {r["name"]: r for r in old["positions"]}
+    print(f"{'position':<20} {'nodes/s':>17} {'depth':>7}  solved", file=out)
+    for result in new["positions"]:
+        previous = before.get(result["name"])
+        if previous is None:
+            continue
+        name = result["name"]
+        ratio = result["nps"] / previous["nps"] if previous["nps"] else 1.0
+        print(
+            f"{name:<20} {previous['nps']:8.0f}->{result['nps']:8.0f} "
+            f"{previous['depth']:3d}->{result['depth']:2d}  "
+            f"{previous['solved']}->{result['solved']}",
+            file=out,
+        )
+        if previous["nodes"] and result["nodes"] and ratio < 1 - tolerance:
+            regressions.append(f"{name}: nodes/s {ratio:.0%} of before")
+        if result["depth"] < previous["depth"]:
+            regressions.append(
+                f"{name}: depth {previous['depth']} -> {result['depth']}"
+            )
+        if previous["solved"] and not result["solved"]:
+            regressions.append(f"{name}: no longer solved")
+    old_summary, new_summary = old["summary"], new["summary"]
+    print(
+        f"total nodes/s {old_summary['nps']:.0f} -> {new_summary['nps']:.0f}, "
+        f"solved {old_summary['solved']}/{old_summary['puzzles']} -> "
+        f"{new_summary['solved']}/{new_summary['puzzles']}",
+        file=out,
+    )
+    for regression in regressions:
+        print("REGRESSION", regression, file=out)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="連珠エンジンのベンチマーク")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="局面集（JSON）")
+    parser.add_argument("--time", type=float, default=2.0, help="1局面の持ち時間（秒）")
+    parser.add_argument(
+        "--nodes", type=int, default=None, help="1局面の局面数の上限（再現性が要るとき）"
+    )
+    parser.add_argument("--depth", type=int, default=20, help="読む深さの上限")
+    parser.add_argument("--only", nargs="+", help="この名前の局面だけ測る")
+    parser.add_argument("--output", help="結果を書き出す JSON ファイル")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("OLD", "NEW"), help="2つの結果を比べる"
+    )
+    args = parser.parse_args(argv)
+    if args.compare:
+        old, new = (load_results(path) for path in args.compare)
+        return 1 if compare(old, new) else 0
+    report = run(load_corpus(args.corpus), args.time, args.nodes, args.depth, args.only)
+    summary = report["summary"]
+    rate = summary["solve_rate"]
+    print(
+        f"{summary['nps']:.0f} nodes/s, mean depth {summary['mean_depth']:.1f}, "
+        f"solved {summary['solved']}/{summary['puzzles']}"
+        + (f" ({rate:.0%})" if rate is not None else "")
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
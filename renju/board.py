@@ -0,0 +1,195 @@
+import random
+
+BOARD_SIZE = 19
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# 中心マスから片側に見るマス数。窓は 2 * WINDOW + 1 マス（11マス）で、
+# 五連の両隣まで見えるので長連との区別ができる。
+WINDOW = 5
+WINDOW_MASK = (1 << (2 * WINDOW + 1)) - 1
+CENTER_BIT = 1 << WINDOW
+SIDE_MASK = (1 << WINDOW) - 1
+
+ZOBRIST_SEED = 0x52454E4A55
+CANDIDATE_DISTANCE = 2
+
+
+def _left_run(bits):
+    # 中心のすぐ左（bit 4）から下位に向かって連続する石の数
+    count = 0
+    for i in range(WINDOW - 1, -1, -1):
+        if not bits >> i & 1:
+            break
+        count += 1
+    return count
+
+
+def _right_run(bits):
+    # 中心のすぐ右（bit 0 に詰めたもの）から上位に向かって連続する石の数
+    count = 0
+    for i in range(WINDOW):
+        if not bits >> i & 1:
+            break
+        count += 1
+    return count
+
+
+LEFT_RUN = [_left_run(bits) for bits in range(1 << WINDOW)]
+RIGHT_RUN = [_right_run(bits) for bits in range(1 << WINDOW)]
+
+
+class BitBoard:
+    """19x19 の盤を、縦・横・斜め2方向の各ラインごとに整数へ詰めて持つ。
+
+    ライン上の位置 pos のマスは bit (pos + WINDOW) に置かれ、両端の WINDOW
+    ビットと盤外のビットは壁として扱う。これにより任意のマスの 11 マス窓が
+    ``(line >> pos) & WINDOW_MASK`` の1回のシフトで取り出せる。
+    """
+
+    def __init__(self, size=BOARD_SIZE):
+        self.size = size
+        self.cells = [EMPTY] * (size * size)  # index = x * size + y
+        self.count = 0
+        # マスごとの (ライン番号, ライン上の位置) を4方向分
+        self.line_index = [[None] * 4 for _ in range(size * size)]
+        self.line_cells = []
+        walls = []
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            lines = {}
+            for x in range(size):
+                for y in range(size):
+                    if d == 0:
+                        key, pos = x, y
+                    elif d == 1:
+                        key, pos = y, x
+                    elif d == 2:
+                        key, pos = x - y, x
+                    else:
+                        key, pos = x + y, x
+                    lines.setdefault(key, []).append((pos, x * size + y))
+            for key in sorted(lines):
+                line = len(self.line_cells)
+                members = sorted(lines[key])
+                cells = [None] * size
+                wall = (1 << (size + 2 * WINDOW)) - 1
+                for pos, cell in members:
+                    cells[pos] = cell
+                    wall &= ~(1 << (pos + WINDOW))
+                    self.line_index[cell][d] = (line, pos)
+                self.line_cells.append(cells)
+                walls.append(wall)
+        self.line_index = [tuple(index) for index in self.line_index]
+        self.walls = walls
+        # stones[p]: プレイヤー p の石, blocked[p]: p から見て塞がっているマス
+        self.stones = [None, [0] * len(walls), [0] * len(walls)]
+        self.blocked = [None, list(walls), list(walls)]
+        # Zobrist キー。別プロセスでも同じ値になるよう種を固定する
+        rng = random.Random(ZOBRIST_SEED + size)
+        self.zobrist = [
+            None,
+            [rng.getrandbits(64) for _ in range(size * size)],
+            [rng.getrandbits(64) for _ in range(size * size)],
+        ]
+        self.hash = 0
+        # 石から距離 CANDIDATE_DISTANCE 以内の空きマス（着手候補）を差分で保つ
+        r = CANDIDATE_DISTANCE
+        self.neighbors = []
+        for x in range(size):
+            for y in range(size):
+                self.neighbors.append(
+                    [
+                        i * size + j
+                        for i in range(x - r, x + r + 1)
+                        for j in range(y - r, y + r + 1)
+                        if 0 <= i < size and 0 <= j < size and (i, j) != (x, y)
+                    ]
+                )
+        self.near = [0] * (size * size)
+        self.candidates = set()
+
+    def on_board(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def get(self, x, y):
+        return self.cells[x * self.size + y]
+
+    def place(self, x, y, player):
+        cell = x * self.size + y
+        self.cells[cell] = player
+        self.count += 1
+        self.hash ^= self.zobrist[player][cell]
+        stones = self.stones[player]
+        blocked = self.blocked[3 - player]
+        for line, pos in self.line_index[cell]:
+            bit = 1 << (pos + WINDOW)
+            stones[line] |= bit
+            blocked[line] |= bit
+        near = self.near
+        cells = self.cells
+        candidates = self.candidates
+        candidates.discard(cell)
+        for other in self.neighbors[cell]:
+            near[other] += 1
+            if near[other] == 1 and cells[other] == EMPTY:
+                candidates.add(other)
+
+    def remove(self, x, y):
+        cell = x * self.size + y
+        player = self.cells[cell]
+        self.cells[cell] = EMPTY
+        self.count -= 1
+        self.hash ^= self.zobrist[player][cell]
+        stones = self.stones[player]
+        blocked = self.blocked[3 - player]
+        for line, pos in self.line_index[cell]:
+            bit = ~(1 << (pos + WINDOW))
+            stones[line] &= bit
+            blocked[line] &= bit
+        near = self.near
+        candidates = self.candidates
+        for other in self.neighbors[cell]:
+            near[other] -= 1
+            if not near[other]:
+                candidates.discard(other)
+        if near[cell]:
+            candidates.add(cell)
+
+    def window(self, x, y, d, player):
+        # (x, y) を中心とした d 方向 11 マスの (自石, 塞がり) ビット列
+        line, pos = self.line_index[x * self.size + y][d]
+        return (
+            (self.stones[player][line] >> pos) & WINDOW_MASK,
+            (self.blocked[player][line] >> pos) & WINDOW_MASK,
+        )
+
+    def run(self, x, y, d, player):
+        # (x, y) に player の石があるとみなした連の長さ・左右の伸び・空き端の数
+        own, blocked = self.window(x, y, d, player)
+        left = LEFT_RUN[own & SIDE_MASK]
+        right = RIGHT_RUN[(own >> (WINDOW + 1)) & SIDE_MASK]
+        empty = ~(own | blocked)
+        open_ends = 0
+        if left < WINDOW and empty >> (WINDOW - 1 - left) & 1:
+            open_ends += 1
+        if right < WINDOW and empty >> (WINDOW + 1 + right) & 1:
+            open_ends += 1
+        return 1 + left + right, left, right, open_ends
+
+    def stones_of(self, player):
+        size = self.size
+        return [
+            divmod(cell, size)
+            for cell, stone in enumerate(self.cells)
+            if stone == player
+        ]
+
+    def empty_cells(self):
+        size = self.size
+        return [
+            divmod(cell, size)
+            for cell, stone in enumerate(self.cells)
+            if stone == EMPTY
+        ]
@@ -0,0 +1,260 @@
+"""盤の8通りの対称をまとめた定石（opening book）。
+
+局面は石の Zobrist キーを8通りの回転・反転について計算し、一番小さい
+キーとそのときの向きで引く。手も同じ向きに直して持つので、向きの違う
+同じ局面はすべて1つの項目にまとまる。
+
+ファイルは (キー 8 バイト, 手 2 バイト, 重み 2 バイト) の固定長の項目を
+キー順に並べただけの形式で、初めて引いたときに読み込む。
+
+    python -m renju.book build --games 20 --plies 8 --time 1.0
+    python -m renju.book build --corpus
+    python -m renju.book build --records games.txt
+    python -m renju.book show
+"""
+
+import argparse
+import logging
+import os
+import random
+import struct
+
+from .board import BLACK, BOARD_SIZE, EMPTY, BitBoard
+
+logger = logging.getLogger(__name__)
+
+BOOK_PATH = os.path.join(os.path.dirname(__file__), "opening_book.bin")
+MAGIC = b"RJBK"
+BOOK_VERSION = 1
+HEADER = struct.Struct("<4sHI")
+ENTRY = struct.Struct("<QHH")
+MAX_WEIGHT = 0xFFFF
+# これより石が多い局面は定石に入れない
+MAX_BOOK_STONES = 12
+
+
+def symmetries(size):
+    # 8通りの対称それぞれの「マス番号 -> 写した先のマス番号」の表
+    n = size - 1
+    maps = (
+        lambda x, y: (x, y),
+        lambda x, y: (n - x, y),
+        lambda x, y: (x, n - y),
+        lambda x, y: (n - x, n - y),
+        lambda x, y: (y, x),
+        lambda x, y: (n - y, x),
+        lambda x, y: (y, n - x),
+        lambda x, y: (n - y, n - x),
+    )
+    tables = []
+    for transform in maps:
+        table = [0] * (size * size)
+        for x in range(size):
+            for y in range(size):
+                i, j = transform(x, y)
+                table[x * size + y] = i * size + j
+        tables.append(table)
+    return tables
+
+
+class OpeningBook:
+    def __init__(self, path=BOOK_PATH, size=BOARD_SIZE):
+        self.path = path
+        self.size = size
+        self.tables = symmetries(size)
+        self.inverse = []
+        for table in self.tables:
+            inverse = [0] * len(table)
+            for cell, image in enumerate(table):
+                inverse[image] = cell
+            self.inverse.append(inverse)
+        self.zobrist = BitBoard(size).zobrist
+        self._entries = None  # キー -> {手: 重み}
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            # 探索の途中で読むので、壊れたファイルは空の定石として扱う
+            try:
+                self._entries = self.read(self.path)
+            except ValueError as error:
+                logger.warning("定石を使いません: %s", error)
+                self._entries = {}
+        return self._entries
+
+    def read(self, path):
+        entries = {}
+        if not os.path.exists(path):
+            return entries
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path}: 定石ファイルが途中で切れています")
+        magic, version, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != BOOK_VERSION:
+            raise ValueError(f"{path}: 定石ファイルの形式が違います")
+        if len(data) < HEADER.size + count * ENTRY.size:
+            raise ValueError(f"{path}: 定石ファイルが途中で切れています")
+        for key, cell, weight in ENTRY.iter_unpack(
+            data[HEADER.size : HEADER.size + count * ENTRY.size]
+        ):
+            entries.setdefault(key, {})[cell] = weight
+        return entries
+
+    def save(self, path=None):
+        path = path or self.path
+        rows = sorted(
+            (key, cell, weight)
+            for key, moves in self.entries.items()
+            for cell, weight in moves.items()
+        )
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, BOOK_VERSION, len(rows)))
+            for row in rows:
+                f.write(ENTRY.pack(*row))
+
+    def canonical(self, cells):
+        # 盤面（マスごとの石の並び）の、対称をまとめたキーとそのときの向き
+        zobrist = self.zobrist
+        stones = [(cell, stone) for cell, stone in enumerate(cells) if stone != EMPTY]
+        best = None
+        for index, table in enumerate(self.tables):
+            key = 0
+            for cell, stone in stones:
+                key ^= zobrist[stone][table[cell]]
+            if best is None or key < best[0]:
+                best = (key, index)
+        return best
+
+    def lookup(self, board, rng=random):
+        # 定石にある手を重みに比例して選ぶ。なければ None
+        if board.count > MAX_BOOK_STONES or not self.entries:
+            return None
+        key, index = self.canonical(board.cells)
+        moves = self.entries.get(key)
+        if not moves:
+            return None
+        inverse = self.inverse[index]
+        cells = [inverse[cell] for cell in moves]
+        cell = rng.choices(cells, weights=list(moves.values()))[0]
+        if board.cells[cell] != EMPTY:
+            return None  # キーの衝突
+        return divmod(cell, self.size)
+
+    def add(self, board, move, weight=1):
+        if board.count > MAX_BOOK_STONES:
+            return
+        key, index = self.canonical(board.cells)
+        cell = self.tables[index][move[0] * self.size + move[1]]
+        moves = self.entries.setdefault(key, {})
+        moves[cell] = min(MAX_WEIGHT, moves.get(cell, 0) + weight)
+
+
+_default_book = None
+
+
+def default_book():
+    # 同梱の定石。ファイルは最初に引いたときに読む
+    global _default_book
+    if _default_book is None:
+        _default_book = OpeningBook()
+    return _default_book
+
+
+def build_from_games(book, games, plies, time_limit, random_plies=2, seed=0):
+    # 自己対局で探索が選んだ手を定石に足す。最初の random_plies 手は実際には
+    # 候補からランダムに選んで打ち、いろいろな局面を通るようにする
+    from .engine import RenjuEngine
+
+    rng = random.Random(seed)
+    for game in range(games):
+        engine = RenjuEngine()
+        engine.book = None
+        center = engine.board_size // 2
+        engine.make_move(center, center)
+        while len(engine.history) < plies and not engine.game_over:
+            x, y = engine.best_move(time_limit=time_limit)
+            book.add(engine.board, (x, y))
+            if len(engine.history) <= random_plies:
+                player = engine.current_player
+                moves = [
+                    move
+                    for move in engine.generate_moves(player, limit=6)
+                    if player != BLACK or not engine.is_forbidden_move(*move)
+                ]
+                x, y = rng.choice(moves)
+            engine.make_move(x, y)
+        print(f"game {game + 1}/{games}: {len(book.entries)} positions")
+
+
+def build_from_corpus(book, time_limit):
+    # ベンチマークの序盤の局面を読ませて定石に足す
+    from .bench import load_corpus, setup_position
+
+    for position in load_corpus():
+        if position["category"] != "opening":
+            continue
+        engine = setup_position(position)
+        move = engine.best_move(time_limit=time_limit)
+        book.add(engine.board, move)
+        print(f"{position['name']}: {move}")
+
+
+def build_from_records(book, records):
+    # 棋譜の勝った側の手を定石に足す
+    for record in records:
+        winner = record.winner
+        if winner is None:
+            continue
+        for engine, move in record.positions():
+            if engine.board.count > MAX_BOOK_STONES:
+                break
+            if engine.current_player == winner:
+                book.add(engine.board, move)
+    print(f"{len(records)} records: {len(book.entries)} positions")
+
+
+def show(book):
+    sizes = {}
+    for moves in book.entries.values():
+        sizes[len(moves)] = sizes.get(len(moves), 0) + 1
+    total = sum(len(moves) for moves in book.entries.values())
+    print(f"{book.path}: {len(book.entries)} positions, {total} moves")
+    for count in sorted(sizes):
+        print(f"  {sizes[count]} positions with {count} move(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="定石ファイルを作る・見る")
+    parser.add_argument("--book", default=BOOK_PATH, help="定石ファイル")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="自己対局や局面集から定石を増やす")
+    build.add_argument("--games", type=int, default=0, help="自己対局の数")
+    build.add_argument("--plies", type=int, default=8, help="1局で定石に入れる手数")
+    build.add_argument("--time", type=float, default=1.0, help="1手の持ち時間（秒）")
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument(
+        "--corpus", action="store_true", help="ベンチマークの序盤の局面も足す"
+    )
+    build.add_argument(
+        "--records", nargs="+", help="勝った側の手を足す棋譜ファイル（record 形式か JSONL）"
+    )
+    commands.add_parser("show", help="定石の大きさを表示する")
+    args = parser.parse_args(argv)
+    book = OpeningBook(args.book)
+    if args.command == "build":
+        if args.records:
+            from .record import load_records
+
+            for path in args.records:
+                build_from_records(book, load_records(path))
+        if args.corpus:
+            build_from_corpus(book, args.time)
+        if args.games:
+            build_from_games(book, args.games, args.plies, args.time, seed=args.seed)
+        book.save()
+    show(book)
+
+
+if __name__ == "__main__":
+    main()
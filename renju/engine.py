@@ -0,0 +1,711 @@
+import logging
+import random
+import time
+
+from .board import BLACK, BOARD_SIZE, DIRECTIONS, EMPTY, WHITE, WINDOW, BitBoard
+from .evaluation import (
+    FIVE_POINTS,
+    OPEN_FOUR_POINTS,
+    THREE_POINTS,
+    IncrementalEvaluator,
+)
+from .patterns import FIVE, PATTERNS, TERN, TERN2
+from .stats import SearchStats
+from .transposition import EXACT, LOWER, UPPER, TranspositionTable
+from .vcf import ThreatSearch
+
+logger = logging.getLogger(__name__)
+
+# 黒番の局面を白番と区別するためにキーへ混ぜる値
+BLACK_TO_MOVE = 0x9E3779B97F4A7C15
+# 五を打った局面の値。評価関数の値はこれよりずっと小さい
+WIN_SCORE = 1_000_000_000
+# 本探索の前に読む四追い・追い詰めの局面数の上限
+VCF_NODES = 5000
+VCT_NODES = 2000
+THREAT_LINES_LIMIT = 1 << 10
+# 1局面で読む手の数（根とそれ以外）とキラー手の加点
+ROOT_MOVES = 30
+MAX_MOVES = 20
+KILLER_BONUS = 5000
+# 探索の前に決める手: (誰の点か, 種類, ログの説明) を上から順に見る
+OWN = 0
+OPPONENT = 1
+IMMEDIATE_THREATS = (
+    (OWN, FIVE_POINTS, "five"),
+    (OPPONENT, FIVE_POINTS, "blocking four"),
+    (OWN, OPEN_FOUR_POINTS, "open four"),
+    (OPPONENT, OPEN_FOUR_POINTS, "blocking open three"),
+)
+# 三三の三が本物か（活四にする点が禁点でないか）を何段まで確かめるか
+FORBIDDEN_DEPTH = 3
+THREE_CACHE_LIMIT = 1 << 16
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TimeManager:
+    """持ち時間と読む局面数の上限。局面数が check_interval 増えるごとに時計を見る。
+
+    stop_event（threading.Event など is_set() を持つもの）がセットされた
+    ときも、次の確認で探索を打ち切る。
+    """
+
+    def __init__(
+        self, time_limit=2.0, max_nodes=None, check_interval=256, stop_event=None
+    ):
+        self.start = time.perf_counter()
+        self.deadline = self.start + time_limit
+        self.max_nodes = max_nodes
+        self.stop_event = stop_event
+        self.check_interval = check_interval
+        self.nodes = 0
+        self.next_check = check_interval
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def check(self):
+        self.next_check = self.nodes + self.check_interval
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout
+
+
+class RenjuEngine:
+    """盤面・着手/取り消し・禁じ手判定・探索をまとめた Tk 非依存の連珠エンジン。"""
+
+    def __init__(self, board_size=BOARD_SIZE, workers=1, weights=None):
+        # weights は評価の重みの組（evaluation.DEFAULT_WEIGHTS と同じ形）
+        self.board_size = board_size
+        # workers > 1 なら根の候補手をプロセスに分けて読む（renju.parallel）
+        self.workers = workers
+        self.parallel = None
+        # 定石。None なら引かない
+        self.book = None
+        if board_size == BOARD_SIZE:
+            # python -m renju.book で book が二重に読み込まれないよう、ここで読む
+            from .book import default_book
+
+            self.book = default_book()
+        self.board = BitBoard(board_size)
+        self.evaluator = IncrementalEvaluator(self.board, weights)
+        self.tt = TranspositionTable()
+        # 読み切った勝ち筋の続き: (局面, 手番) -> (種類, 手順)。相手が読みどおりに
+        # 受けたら、読み直さずに続きを打つ（読み直すと局面数の上限で諦めることがある）
+        self.threat_lines = {}
+        self.timer = TimeManager()
+        self.search_info = None
+        self.stats = None
+        # 三三の確認結果: (局面, マス, 深さ) -> 禁じ手か
+        self.three_cache = {}
+        self.killers = {}
+        # 履歴ヒューリスティック: history_scores[player][cell]
+        cells = board_size * board_size
+        self.history_scores = [None, [0] * cells, [0] * cells]
+        self.current_player = BLACK
+        self.game_over = False
+        self.winner = None
+        self.last_move = None
+        self.history = []
+
+    def copy(self, workers=None):
+        # 別スレッド・別プロセスで読ませるための複製。置換表は共有する
+        # workers を渡せば、複製はそのプロセス数で読む
+        if workers is None:
+            workers = self.workers
+        clone = RenjuEngine(self.board_size, workers, self.evaluator.weights)
+        clone.tt = self.tt
+        clone.threat_lines = self.threat_lines
+        if workers > 1:
+            clone.parallel = self.parallel_searcher()
+        if self.stats is not None:
+            clone.enable_stats()
+        for x, y, player, _ in self.history:
+            clone.make_move(x, y, player)
+        return clone
+
+    def is_empty(self, x, y):
+        return self.board.on_board(x, y) and self.board.get(x, y) == EMPTY
+
+    def play(self, x, y, player):
+        # 探索用の着手。盤面と評価値だけを更新する
+        self.board.place(x, y, player)
+        self.evaluator.update(x, y)
+
+    def unplay(self, x, y):
+        self.board.remove(x, y)
+        self.evaluator.update(x, y)
+
+    def make_move(self, x, y, player=None):
+        # 戻り値: 勝ち "win" / 引き分け "draw" / 続行 None
+        if player is None:
+            player = self.current_player
+        self.play(x, y, player)
+        self.history.append((x, y, player, self.last_move))
+        self.last_move = (x, y)
+        if self.check_winner(x, y):
+            self.game_over = True
+            self.winner = player
+            return "win"
+        if self.board.count == self.board_size * self.board_size:
+            self.game_over = True
+            return "draw"
+        self.current_player = 3 - player
+        return None
+
+    def undo(self):
+        x, y, player, last_move = self.history.pop()
+        self.unplay(x, y)
+        self.last_move = last_move
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        return x, y
+
+    def classify(self, x, y, d, player):
+        # (x, y) を player の石とみなした d 方向の形をテーブルから引く
+        own, blocked = self.board.window(x, y, d, player)
+        return PATTERNS[TERN[own] + TERN2[blocked]]
+
+    def line_positions(self, x, y, d, player):
+        # (x, y) を通る d 方向の連の座標（端から順に）
+        dx, dy = DIRECTIONS[d]
+        _, left, right, _ = self.board.run(x, y, d, player)
+        return [(x + k * dx, y + k * dy) for k in range(-left, right + 1)]
+
+    def check_winner(self, x, y):
+        player = self.board.get(x, y)
+        for d in range(4):
+            if self.classify(x, y, d, player)[0] == FIVE:  # 厳密に5連続のみ
+                logger.debug(
+                    "winner: player %d with %s",
+                    player,
+                    self.line_positions(x, y, d, player),
+                )
+                return True
+        return False
+
+    def forbidden_reason(self, x, y, depth=FORBIDDEN_DEPTH):
+        # 黒が (x, y) に打ったときの禁じ手の種類。五ができるなら禁じ手ではない
+        # 三三は、活四にする点がすべて禁点の三を三と数えずに確かめる（depth 手先まで）
+        cell = x * self.board_size + y
+        reason = self.evaluator.forbidden_map().get(cell)
+        if reason != "three-three" or depth <= 0:
+            return reason
+        key = (self.board.hash, cell, depth)
+        cached = self.three_cache.get(key)
+        if cached is None:
+            if len(self.three_cache) >= THREE_CACHE_LIMIT:
+                self.three_cache.clear()
+            cached = self.three_cache[key] = self.real_threes(x, y, depth) >= 2
+        return reason if cached else None
+
+    def real_threes(self, x, y, depth):
+        # 黒が (x, y) に打ってできる三のうち、活四にする点に禁点でない点があるものの数
+        cell = x * self.board_size + y
+        line_info = self.evaluator.line_info
+        lines = [
+            line
+            for line, pos in self.board.line_index[cell]
+            if line_info[line][BLACK][THREE_POINTS] >> (pos + WINDOW) & 1
+        ]
+        line_cells = self.board.line_cells
+        count = 0
+        self.play(x, y, BLACK)
+        try:
+            for line in lines:
+                mask = line_info[line][BLACK][OPEN_FOUR_POINTS]
+                while mask:
+                    low = mask & -mask
+                    mask ^= low
+                    point = line_cells[line][low.bit_length() - 1 - WINDOW]
+                    i, j = divmod(point, self.board_size)
+                    if self.forbidden_reason(i, j, depth - 1) is None:
+                        count += 1
+                        break
+        finally:
+            self.unplay(x, y)
+        return count
+
+    def is_forbidden_move(self, x, y):
+        return self.forbidden_reason(x, y) is not None
+
+    def evaluate_position(self, x, y, player):
+        # (x, y) に player が打ったときの評価。盤面は書き換えない
+        score = 0
+        opponent = 3 - player
+        attack = self.evaluator.attack[player]
+        sign = 1 if player == WHITE else -1
+        for d in range(4):
+            score += sign * attack[self.classify(x, y, d, player)[0]]
+            score += self.evaluator.block[self.classify(x, y, d, opponent)[0]]
+        return score
+
+    def check_immediate_threats(self, player=WHITE):
+        # 探索の前に決まる手。threat_index を IMMEDIATE_THREATS の順に見て、
+        # 最初に点がある種類のうち手の価値が一番高い点を返す
+        size = self.board_size
+        index = self.evaluator.threat_index()
+        move_score = self.evaluator.move_score
+        for side, kind, label in IMMEDIATE_THREATS:
+            owner = player if side == OWN else 3 - player
+            cells = index[owner][kind]
+            if player == BLACK:
+                cells = [
+                    cell
+                    for cell in cells
+                    if not self.is_forbidden_move(*divmod(cell, size))
+                ]
+            if cells:
+                cell = max(cells, key=lambda c: (move_score(c, player), -c))
+                move = divmod(cell, size)
+                logger.debug("%s at %d,%d", label, *move)
+                return move
+        return None
+
+    def predicted_reply(self):
+        # 現在の手番が打ちそうな手（相手の手番に先読みする局面を選ぶため）。
+        # 直前の探索が置換表に残した最善手、なければ候補手の先頭
+        player = self.current_player
+        key = self.board.hash if player == WHITE else self.board.hash ^ BLACK_TO_MOVE
+        entry = self.tt.probe(key)
+        tt_move = entry[4] if entry is not None else None
+        for move in self.generate_moves(player, tt_move=tt_move):
+            if player != BLACK or not self.is_forbidden_move(*move):
+                return move
+        return None
+
+    def get_all_empty_cells(self):
+        return self.board.empty_cells()
+
+    def is_five_move(self, x, y, player):
+        classify = self.classify
+        return any(classify(x, y, d, player)[0] == FIVE for d in range(4))
+
+    def minimax(self, depth, alpha, beta, maximizing_player):
+        timer = self.timer
+        timer.nodes += 1
+        if timer.nodes >= timer.next_check:
+            timer.check()
+        if depth == 0:
+            return self.evaluate_board()
+
+        key = self.board.hash if maximizing_player else self.board.hash ^ BLACK_TO_MOVE
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            _, tt_depth, flag, score, tt_move, _ = entry
+            if tt_depth >= depth and (
+                flag == EXACT
+                or (flag == LOWER and score >= beta)
+                or (flag == UPPER and score <= alpha)
+            ):
+                return score
+
+        # 五を打てるならそれで終わり。残り深さが大きいほど早い勝ち
+        player = WHITE if maximizing_player else BLACK
+        if self.evaluator.fives[player]:
+            return WIN_SCORE + depth if maximizing_player else -WIN_SCORE - depth
+
+        moves = self.generate_moves(player, depth, tt_move)
+        if not moves:
+            return 0
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+        if maximizing_player:
+            best_eval = float("-inf")
+            for x, y in moves:
+                self.play(x, y, WHITE)
+                try:
+                    eval = self.minimax(depth - 1, alpha, beta, False)
+                finally:
+                    self.unplay(x, y)
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = (x, y)
+                alpha = max(alpha, eval)
+                if beta <= alpha:
+                    self.record_cutoff(WHITE, depth, x, y)
+                    break
+        else:
+            best_eval = float("inf")
+            for x, y in moves:
+                if not self.is_forbidden_move(x, y):
+                    self.play(x, y, BLACK)
+                    try:
+                        eval = self.minimax(depth - 1, alpha, beta, True)
+                    finally:
+                        self.unplay(x, y)
+                    if eval < best_eval:
+                        best_eval = eval
+                        best_move = (x, y)
+                    beta = min(beta, eval)
+                    if beta <= alpha:
+                        self.record_cutoff(BLACK, depth, x, y)
+                        break
+
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, best_eval, best_move)
+        return best_eval
+
+    def evaluate_board(self):
+        # 着手・取り消しのたびに差分更新している値を返すだけ
+        return self.evaluator.score
+
+    def generate_moves(self, player, depth=0, tt_move=None, limit=MAX_MOVES):
+        # 石から2マス以内の空きマスを、置換表の手・脅威の点数・キラー手・
+        # 履歴の順に並べて上位 limit 手を返す
+        size = self.board_size
+        evaluator = self.evaluator
+        opponent = 3 - player
+        # 四があるときは五を打つか、相手の五を止めるしかない
+        if evaluator.fives[player]:
+            return [divmod(min(evaluator.points(player, FIVE_POINTS)), size)]
+        if evaluator.fives[opponent]:
+            return [
+                divmod(cell, size)
+                for cell in sorted(evaluator.points(opponent, FIVE_POINTS))
+            ]
+        cells = self.board.candidates
+        if not cells:
+            center = size // 2
+            return [(center, center)] if self.is_empty(center, center) else []
+        move_score = evaluator.move_score
+        history = self.history_scores[player]
+        killers = self.killers.get(depth, ())
+        scored = sorted(
+            (
+                (
+                    move_score(cell, player)
+                    + history[cell]
+                    + (KILLER_BONUS if cell in killers else 0),
+                    cell,
+                )
+                for cell in cells
+            ),
+            reverse=True,
+        )
+        moves = [divmod(cell, size) for _, cell in scored[:limit]]
+        if tt_move is not None and self.is_empty(*tt_move):
+            # 前回この局面で一番良かった手から読む
+            if tt_move in moves:
+                moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    def record_cutoff(self, player, depth, x, y):
+        # β カットを起こした手をキラー手と履歴に覚える
+        cell = x * self.board_size + y
+        killers = self.killers.setdefault(depth, [])
+        if cell not in killers:
+            killers.insert(0, cell)
+            del killers[2:]
+        self.history_scores[player][cell] += depth * depth
+
+    def enable_stats(self):
+        # 以降の best_move ごとに self.stats へ統計を取る
+        self.disable_stats()
+        stats = self.stats = SearchStats()
+        self.evaluator.update = stats.timed("eval", self.evaluator.update)
+        self.generate_moves = stats.timed("movegen", self.generate_moves)
+        self.is_forbidden_move = stats.timed("rules", self.is_forbidden_move)
+        self.is_five_move = stats.timed("rules", self.is_five_move)
+        self.record_cutoff = stats.counted(self.record_cutoff)
+        return stats
+
+    def disable_stats(self):
+        # enable_stats で被せたラッパーを外し、クラスのメソッドに戻す
+        for name in (
+            "generate_moves",
+            "is_forbidden_move",
+            "is_five_move",
+            "record_cutoff",
+        ):
+            self.__dict__.pop(name, None)
+        self.evaluator.__dict__.pop("update", None)
+        self.stats = None
+
+    def best_move(
+        self,
+        time_limit=2.0,
+        max_nodes=None,
+        max_depth=20,
+        stop_event=None,
+        on_progress=None,
+    ):
+        # 現在の手番の着手を返す。time_limit 秒か max_nodes 局面で読みを打ち切る
+        # on_progress は深さを1つ読み切るごとに search_info と同じ辞書で呼ばれる
+        stats = self.stats
+        if stats is None:
+            return self._best_move(
+                time_limit, max_nodes, max_depth, stop_event, on_progress
+            )
+        stats.begin(self)
+        self.search_info = None
+        try:
+            return self._best_move(
+                time_limit, max_nodes, max_depth, stop_event, on_progress
+            )
+        finally:
+            stats.finish(self)
+            logger.info("search: %s", stats.summary())
+
+    def _best_move(self, time_limit, max_nodes, max_depth, stop_event, on_progress):
+        player = self.current_player
+        opponent = 3 - player
+        # 脅威探索も αβ 探索も同じ持ち時間・局面数の中で読む
+        timer = self.timer = TimeManager(time_limit, max_nodes, stop_event=stop_event)
+        start = timer.start
+        if self.book is not None:
+            move = self.book.lookup(self.board)
+            if move is not None:
+                self.search_info = {
+                    "move": move,
+                    "score": 0,
+                    "depth": 0,
+                    "nodes": 0,
+                    "time": time.perf_counter() - start,
+                    "source": "book",
+                }
+                return move
+        # 定石にない初手（中央以外の黒の1手目）には黒の隣（8方向）に置く
+        black_stones = self.board.stones_of(BLACK)
+        if player == WHITE and len(black_stones) == 1:
+            x, y = black_stones[0]
+            adjacent = [
+                (x + 1, y),
+                (x - 1, y),
+                (x, y + 1),
+                (x, y - 1),  # 上下左右
+                (x + 1, y + 1),
+                (x + 1, y - 1),
+                (x - 1, y + 1),
+                (x - 1, y - 1),
+            ]  # 斜め
+            valid_adjacent = [
+                (adj_x, adj_y)
+                for adj_x, adj_y in adjacent
+                if self.is_empty(adj_x, adj_y)
+            ]
+            if valid_adjacent:
+                return random.choice(valid_adjacent)
+
+        # 前の手で読み切った勝ち筋に相手が読みどおり受けたなら、その続きを打つ
+        proven = self.threat_lines.get((self.board.hash, player))
+        if proven is not None:
+            source, line = proven
+            if self.is_empty(*line[0]) and not (
+                player == BLACK and self.is_forbidden_move(*line[0])
+            ):
+                return self._play_threat_line(player, source, line)
+
+        # 四追い・三を含む追い詰めで勝てるなら読み切った手順どおりに打つ
+        threats = ThreatSearch(self, timer=timer)
+        if self.stats is not None:
+            timed = self.stats.timed
+            for name in ("find_vcf", "find_vct", "defences"):
+                setattr(threats, name, timed("threats", getattr(threats, name)))
+        try:
+            for source, find, budget in (
+                ("vcf", threats.find_vcf, VCF_NODES),
+                ("vct", threats.find_vct, VCT_NODES),
+            ):
+                line = find(player, max_nodes=budget)
+                if line:
+                    return self._play_threat_line(player, source, line)
+        except SearchTimeout:
+            pass  # 時間切れ。五・四の受けだけは下で確かめる
+
+        if player == WHITE:
+            immediate_move = self.check_immediate_threats()
+            if immediate_move:
+                return immediate_move
+
+        # 相手に四追いがあるなら、それを消す手だけを読む
+        root_moves = None
+        try:
+            line = threats.find_vcf(opponent, max_nodes=VCF_NODES)
+            if line:
+                root_moves = threats.defences(opponent, line) or None
+        except SearchTimeout:
+            pass
+
+        return self.iterative_deepening(
+            player,
+            time_limit,
+            max_nodes,
+            max_depth,
+            stop_event,
+            on_progress,
+            root_moves,
+            timer,
+        )
+
+    def _play_threat_line(self, player, source, line):
+        # 勝ち筋 line の初手を返し、相手が line[1] で受けた局面に続きを覚える
+        if len(line) > 2 and self.is_empty(*line[1]):
+            self.play(*line[0], player)
+            self.play(*line[1], 3 - player)
+            key = (self.board.hash, player)
+            self.unplay(*line[1])
+            self.unplay(*line[0])
+            if len(self.threat_lines) >= THREAT_LINES_LIMIT:
+                self.threat_lines.clear()
+            self.threat_lines[key] = (source, line[2:])
+        self.search_info = {
+            "move": line[0],
+            "score": WIN_SCORE if player == WHITE else -WIN_SCORE,
+            "depth": len(line),
+            "nodes": self.timer.nodes,
+            "time": self.timer.elapsed(),
+            "source": source,
+            "line": line,
+        }
+        return line[0]
+
+    def search_root(self, player, depth, moves):
+        maximizing = player == WHITE
+        best_move = None
+        best_score = float("-inf") if maximizing else float("inf")
+        alpha, beta = float("-inf"), float("inf")
+        for x, y in moves:
+            if player == BLACK and self.is_forbidden_move(x, y):
+                continue
+            if self.is_five_move(x, y, player):
+                score = WIN_SCORE + depth
+                return (x, y), score if maximizing else -score
+            self.play(x, y, player)
+            try:
+                score = self.minimax(depth - 1, alpha, beta, not maximizing)
+            finally:
+                self.unplay(x, y)
+            if maximizing and score > best_score:
+                best_move, best_score = (x, y), score
+                alpha = max(alpha, score)
+            elif not maximizing and score < best_score:
+                best_move, best_score = (x, y), score
+                beta = min(beta, score)
+        return best_move, best_score
+
+    def iterative_deepening(
+        self,
+        player,
+        time_limit=2.0,
+        max_nodes=None,
+        max_depth=20,
+        stop_event=None,
+        on_progress=None,
+        root_moves=None,
+        timer=None,
+    ):
+        # 深さ 1, 2, 3... と読み、最後に読み切った深さの最善手を返す。
+        # timer を渡せば、その残りの持ち時間・局面数で読む
+        if timer is None:
+            timer = TimeManager(time_limit, max_nodes, stop_event=stop_event)
+        self.timer = timer
+        self.tt.new_search()
+        self.killers = {}
+        for scores in self.history_scores[1:]:
+            for cell in range(len(scores)):
+                scores[cell] >>= 1  # 前回までの履歴は半分に減らして残す
+        if root_moves:
+            moves = list(root_moves)
+        else:
+            moves = self.generate_moves(player, limit=ROOT_MOVES)
+        if player == BLACK:
+            moves = [move for move in moves if not self.is_forbidden_move(*move)]
+        if not moves:
+            # 止める点が禁点なら負けは決まっている。打てる手をどれか1つ打つ
+            cells = self.get_all_empty_cells()
+            moves = [
+                next(
+                    (
+                        move
+                        for move in cells
+                        if player != BLACK or not self.is_forbidden_move(*move)
+                    ),
+                    cells[0],
+                )
+            ]
+        best_move, best_score, completed = moves[0], 0, 0
+        if len(moves) > 1 and self.workers > 1:
+            return self.parallel_search(player, moves, max_depth, on_progress)
+        if len(moves) > 1:
+            for depth in range(1, max_depth + 1):
+                try:
+                    move, score = self.search_root(player, depth, moves)
+                except SearchTimeout:
+                    break
+                if move is None:
+                    break
+                best_move, best_score, completed = move, score, depth
+                if on_progress is not None:
+                    on_progress(self.make_search_info(best_move, best_score, depth))
+                # 前回の最善手から読むと枝刈りがよく効く
+                moves.remove(move)
+                moves.insert(0, move)
+                if abs(score) >= WIN_SCORE:
+                    break  # 勝ち（または負け）を読み切った
+        self.search_info = self.make_search_info(best_move, best_score, completed)
+        return best_move
+
+    def parallel_search(self, player, moves, max_depth, on_progress=None):
+        # self.timer の残りの持ち時間・局面数をワーカーに渡して読ませる
+        timer = self.timer
+        base = timer.nodes
+        time_limit = max(0.0, timer.deadline - time.perf_counter())
+        max_nodes = None
+        if timer.max_nodes is not None:
+            max_nodes = max(0, timer.max_nodes - base)
+
+        def report(move, score, depth, nodes):
+            timer.nodes = base + nodes
+            on_progress(self.make_search_info(move, score, depth))
+
+        move, score, depth, nodes = self.parallel_searcher().search(
+            self,
+            player,
+            moves,
+            time_limit,
+            max_depth,
+            timer.stop_event,
+            max_nodes,
+            report if on_progress is not None else None,
+        )
+        timer.nodes = base + nodes
+        self.search_info = self.make_search_info(move, score, depth)
+        return move
+
+    def parallel_searcher(self):
+        from .parallel import ParallelSearcher  # parallel がこのモジュールを使う
+
+        if self.parallel is None:
+            self.parallel = ParallelSearcher(self.workers)
+        return self.parallel
+
+    def close(self):
+        # 並列探索のワーカープロセスを止める
+        if self.parallel is not None:
+            self.parallel.close()
+
+    def make_search_info(self, move, score, depth):
+        return {
+            "move": move,
+            "score": score,
+            "depth": depth,
+            "nodes": self.timer.nodes,
+            "time": self.timer.elapsed(),
+            "source": "search",
+        }
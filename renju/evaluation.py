@@ -0,0 +1,267 @@
+from .board import BLACK, EMPTY, WHITE, WINDOW, WINDOW_MASK
+from .patterns import (
+    FIVE,
+    FOUR,
+    OPEN_FOUR,
+    OPEN_THREE,
+    OVERLINE,
+    PATTERNS,
+    TERN,
+    TERN2,
+)
+
+# 種類ごとの点数（patterns の NONE..OVERLINE の順）
+# 自分の形: 白は加点、黒は減点
+ATTACK_WEIGHTS = {
+    WHITE: (0, 500, 2000, 8000, 15000, 30000, 100000, 0),
+    BLACK: (0, 300, 1500, 7000, 15000, 25000, 100000, 0),
+}
+# 相手がそこに打ったときにできる形を止める価値
+BLOCK_WEIGHTS = (0, 0, 0, 500, 8000, 30000, 60000, 0)
+# 重みの組。JSON に書けるよう名前付きのリストで持つ（renju.tournament で使う）
+DEFAULT_WEIGHTS = {
+    "attack_black": list(ATTACK_WEIGHTS[BLACK]),
+    "attack_white": list(ATTACK_WEIGHTS[WHITE]),
+    "block": list(BLOCK_WEIGHTS),
+}
+
+# ラインごとの点のマスクの並び（line_info[line][player][...]）
+FIVE_POINTS = 0  # 打てば五
+FOUR_POINTS = 1  # 打てば止め四（飛び四を含む）
+OPEN_FOUR_POINTS = 2  # 打てば活四
+THREE_POINTS = 3  # 打てば活三
+OVERLINE_POINTS = 4  # 打てば長連
+DOUBLE_FOUR_POINTS = 5  # 打てば1本のラインに四が2つ
+POINT_KIND_COUNT = 6
+
+POINT_KINDS = {
+    FIVE: FIVE_POINTS,
+    FOUR: FOUR_POINTS,
+    OPEN_FOUR: OPEN_FOUR_POINTS,
+    OPEN_THREE: THREE_POINTS,
+    OVERLINE: OVERLINE_POINTS,
+}
+
+CACHE_LIMIT = 1 << 18
+
+
+class IncrementalEvaluator:
+    """盤面の評価値（白から見た値）とラインごとの脅威を差分で保つ。
+
+    ラインの値はそのライン上の空きマスそれぞれについて「白が打てばできる形」
+    から「黒が打てばできる形」を引いた点数の合計で、石が置かれる/取られる
+    たびにそのマスを通る4本のラインだけを引き直す。ラインの値は
+    (壁, 黒, 白) のビット列をキーにメモ化しているので、探索中に同じ並びが
+    現れれば辞書を1回引くだけで済む。
+
+    line_info[line] は (点数, 黒の点, 白の点, 黒の手の価値, 白の手の価値)。
+    点は FIVE_POINTS などの順に並んだライン上のビットマスク（BitBoard の石と
+    同じビット位置）、手の価値はライン上の位置ごとの「そこに打ったときの
+    攻め＋受けの点数」で、着手の並べ替えに使う。
+
+    forbidden_map() は黒の禁点の候補（マス番号 -> "overline" / "four-four" /
+    "three-three"）。石を置いたマスを通る4本のラインのうち、黒の点のマスクが
+    変わったマスだけを問い合わせのときにまとめて引き直す。
+    "three-three" は三の片方が本物の三でない（活四にする点が禁点）かもしれない
+    ので、確定は RenjuEngine.forbidden_reason が行う。
+    """
+
+    def __init__(self, board, weights=None):
+        self.board = board
+        weights = weights or DEFAULT_WEIGHTS
+        self.weights = weights
+        self.attack = [
+            None,
+            tuple(weights["attack_black"]),
+            tuple(weights["attack_white"]),
+        ]
+        self.block = tuple(weights["block"])
+        self.cache = {}
+        self.line_info = [self.line_value(line) for line in range(len(board.walls))]
+        self.score = 0
+        # fives[p]: p が打てば五になるマスの数（= p の四の数）
+        # open_fours[p]: p が打てば活四になるマスの数（= p の活三の数の目安）
+        self.fives = [0, 0, 0]
+        self.open_fours = [0, 0, 0]
+        self.forbidden = {}
+        # forbidden を引き直したときのライン情報と、その後に変わったライン
+        self.synced = list(self.line_info)
+        self.dirty = set()
+        for info in self.line_info:
+            self._add(info, 1)
+
+    def _add(self, info, sign):
+        self.score += sign * info[0]
+        for player in (BLACK, WHITE):
+            points = info[player]
+            if points[FIVE_POINTS]:
+                self.fives[player] += sign * points[FIVE_POINTS].bit_count()
+            if points[OPEN_FOUR_POINTS]:
+                self.open_fours[player] += sign * points[OPEN_FOUR_POINTS].bit_count()
+
+    def line_value(self, line):
+        board = self.board
+        wall = board.walls[line]
+        black = board.stones[BLACK][line]
+        white = board.stones[WHITE][line]
+        key = (wall, black, white)
+        info = self.cache.get(key)
+        if info is not None:
+            return info
+        if len(self.cache) >= CACHE_LIMIT:
+            self.cache.clear()
+        attack_black = self.attack[BLACK]
+        attack_white = self.attack[WHITE]
+        block = self.block
+        blocked_black = white | wall
+        blocked_white = black | wall
+        occupied = blocked_black | black
+        score = 0
+        points_black = [0] * POINT_KIND_COUNT
+        points_white = [0] * POINT_KIND_COUNT
+        order_black = [0] * board.size
+        order_white = [0] * board.size
+        for pos in range(board.size):
+            bit = 1 << (pos + WINDOW)
+            if occupied & bit:
+                continue
+            kind_black, fours_black, _, _ = PATTERNS[
+                TERN[(black >> pos) & WINDOW_MASK]
+                + TERN2[(blocked_black >> pos) & WINDOW_MASK]
+            ]
+            kind_white = PATTERNS[
+                TERN[(white >> pos) & WINDOW_MASK]
+                + TERN2[(blocked_white >> pos) & WINDOW_MASK]
+            ][0]
+            score += attack_white[kind_white] - attack_black[kind_black]
+            order_black[pos] = attack_black[kind_black] + block[kind_white]
+            order_white[pos] = attack_white[kind_white] + block[kind_black]
+            if kind_black in POINT_KINDS:
+                points_black[POINT_KINDS[kind_black]] |= bit
+            if fours_black >= 2:
+                points_black[DOUBLE_FOUR_POINTS] |= bit
+            if kind_white in POINT_KINDS:
+                points_white[POINT_KINDS[kind_white]] |= bit
+        info = (
+            score,
+            tuple(points_black),
+            tuple(points_white),
+            tuple(order_black),
+            tuple(order_white),
+        )
+        self.cache[key] = info
+        return info
+
+    def update(self, x, y):
+        # (x, y) の石が置かれた/取られた後に呼ぶ
+        line_info = self.line_info
+        for line, _ in self.board.line_index[x * self.board.size + y]:
+            old = line_info[line]
+            new = self.line_value(line)
+            if new is not old:
+                self._add(old, -1)
+                self._add(new, 1)
+                line_info[line] = new
+                self.dirty.add(line)
+
+    def forbidden_map(self):
+        # 前回から変わったラインの黒の点を見比べ、変わったマスだけ禁点の候補を
+        # 引き直す。探索で打って戻したラインは同じ情報に戻るので何もしない
+        dirty = self.dirty
+        if not dirty:
+            return self.forbidden
+        line_info = self.line_info
+        synced = self.synced
+        line_cells = self.board.line_cells
+        changed = set()
+        for line in dirty:
+            old = synced[line]
+            new = line_info[line]
+            if old is new:
+                continue
+            synced[line] = new
+            mask = 0
+            for before, after in zip(old[BLACK], new[BLACK]):
+                mask |= before ^ after
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                changed.add(line_cells[line][low.bit_length() - 1 - WINDOW])
+        dirty.clear()
+        cells = self.board.cells
+        forbidden = self.forbidden
+        for cell in changed:
+            reason = None
+            if cells[cell] == EMPTY:
+                reason = self.forbidden_candidate(cell)
+            if reason is None:
+                forbidden.pop(cell, None)
+            else:
+                forbidden[cell] = reason
+        return forbidden
+
+    def forbidden_candidate(self, cell):
+        # 4本のラインの黒の点だけから見た禁じ手の種類。五ができるなら禁じ手ではない
+        line_info = self.line_info
+        fours = threes = 0
+        overline = False
+        for line, pos in self.board.line_index[cell]:
+            bit = 1 << (pos + WINDOW)
+            points = line_info[line][BLACK]
+            if points[FIVE_POINTS] & bit:
+                return None
+            if points[OVERLINE_POINTS] & bit:
+                overline = True
+            elif points[DOUBLE_FOUR_POINTS] & bit:
+                fours += 2
+            elif (points[FOUR_POINTS] | points[OPEN_FOUR_POINTS]) & bit:
+                fours += 1
+            elif points[THREE_POINTS] & bit:
+                threes += 1
+        if overline:
+            return "overline"
+        if fours >= 2:
+            return "four-four"
+        if threes >= 2:
+            return "three-three"
+        return None
+
+    def move_score(self, cell, player):
+        # player が cell に打つ手の価値（4方向の合計）
+        line_info = self.line_info
+        order = 2 + player
+        return sum(
+            line_info[line][order][pos] for line, pos in self.board.line_index[cell]
+        )
+
+    def points(self, player, kind):
+        # player が打てば kind（FIVE_POINTS など）の形になるマス番号の集合
+        cells = set()
+        line_cells = self.board.line_cells
+        for line, info in enumerate(self.line_info):
+            mask = info[player][kind]
+            while mask:
+                low = mask & -mask
+                cells.add(line_cells[line][low.bit_length() - 1 - WINDOW])
+                mask ^= low
+        return cells
+
+    def threat_index(self):
+        # 両者のすべての種類の点を全ラインの1回の走査で集めた索引。
+        # index[player][kind] は player が打てば kind の形になるマス番号の集合で、
+        # 相手にとってはそのまま受けの点になる（四なら FIVE_POINTS、活三なら
+        # OPEN_FOUR_POINTS）。飛び四・飛び三も含む
+        index = [None] + [
+            [set() for _ in range(POINT_KIND_COUNT)] for _ in (BLACK, WHITE)
+        ]
+        line_cells = self.board.line_cells
+        for line, info in enumerate(self.line_info):
+            cells = line_cells[line]
+            for player in (BLACK, WHITE):
+                sets = index[player]
+                for kind, mask in enumerate(info[player]):
+                    while mask:
+                        low = mask & -mask
+                        sets[kind].add(cells[low.bit_length() - 1 - WINDOW])
+                        mask ^= low
+        return index
@@ -0,0 +1,259 @@
+"""根分割による複数プロセスでの並列探索。
+
+根の候補手をワーカー数に分けて各プロセスで反復深化し、全ワーカーが読み
+切った一番深い深さの結果を比べて最善手を決める。どれかのワーカーが勝ちを
+読み切ったら、ほかのワーカーも止めてその手を返す。置換表はワーカーごとに
+プロセス内で持ち回すので、2手目以降は前の手の読みも再利用される。
+
+``python -m renju.parallel`` でワーカー数ごとの到達深さと局面数を測る。
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+
+from .board import BLACK, WHITE
+from .engine import ROOT_MOVES, WIN_SCORE, RenjuEngine, SearchTimeout, TimeManager
+
+# ワーカープロセス内で使い回す置換表
+_worker_tt = None
+
+
+def _search_slice(
+    moves,
+    weights,
+    player,
+    root_moves,
+    time_limit,
+    max_depth,
+    max_nodes,
+    stop,
+    progress,
+    index,
+):
+    # ワーカー側。moves の局面を作り、root_moves だけを深さ 1, 2... と読む。
+    # stop（Manager の Event）がセットされたら次の確認で打ち切り、深さを
+    # 1つ読み切るごとに progress へ (index, 深さ, 手, 値, 局面数) を送る
+    global _worker_tt
+    engine = RenjuEngine(weights=weights)
+    # 局面数で打ち切るときは結果が毎回同じになるよう、前の読みを持ち込まない
+    if _worker_tt is not None and max_nodes is None:
+        engine.tt = _worker_tt
+    _worker_tt = engine.tt
+    for x, y, stone in moves:
+        engine.play(x, y, stone)
+    engine.timer = TimeManager(time_limit, max_nodes, stop_event=stop)
+    engine.tt.new_search()
+    root_moves = list(root_moves)
+    results = {}
+    for depth in range(1, max_depth + 1):
+        try:
+            move, score = engine.search_root(player, depth, root_moves)
+        except SearchTimeout:
+            break
+        if move is None:
+            break
+        results[depth] = (move, score)
+        progress.put((index, depth, move, score, engine.timer.nodes))
+        root_moves.remove(move)
+        root_moves.insert(0, move)
+        if abs(score) >= WIN_SCORE:
+            break
+    return results, engine.timer.nodes
+
+
+def _combine(results, player):
+    # ワーカーごとの {深さ: (手, 値)} から、全員が読み切った一番深い深さの最善手。
+    # どれかのワーカーが勝ちを読み切っていれば、一番早く勝てる手を返す
+    sign = 1 if player == WHITE else -1
+    wins = [
+        (score * sign, depth, move, score)
+        for r in results
+        for depth, (move, score) in r.items()
+        if score * sign >= WIN_SCORE
+    ]
+    if wins:
+        _, depth, move, score = max(wins)
+        return move, score, depth
+    depth = min(max(r, default=0) for r in results)
+    if depth == 0:
+        return None, 0, 0
+    maximizing = player == WHITE
+    best_move, best_score = None, None
+    for r in results:
+        move, score = r[depth]
+        if (
+            best_score is None
+            or (maximizing and score > best_score)
+            or (not maximizing and score < best_score)
+        ):
+            best_move, best_score = move, score
+    return best_move, best_score, depth
+
+
+class ParallelSearcher:
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+        self.manager = None
+        # close() が読みの途中の search() を止めて、終わるのを待つための合図
+        self.closing = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def start(self):
+        if self.executor is None:
+            self.closing.clear()
+            # Tk のスレッドから fork しないよう spawn で起動する
+            context = multiprocessing.get_context("spawn")
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context
+            )
+            # 中止の合図と途中経過をワーカーとやりとりする
+            self.manager = context.Manager()
+        return self.executor
+
+    def close(self):
+        if self.executor is not None:
+            # 別スレッドの search() を止め、ワーカーが Manager の Event や Queue を
+            # 使い終えてから Manager を落とす
+            self.closing.set()
+            self.idle.wait()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self.manager.shutdown()
+            self.manager = None
+
+    def search(
+        self,
+        engine,
+        player,
+        root_moves,
+        time_limit=2.0,
+        max_depth=20,
+        stop_event=None,
+        max_nodes=None,
+        on_progress=None,
+    ):
+        # (最善手, 値, 深さ, 局面数) を返す。max_nodes はワーカーに等分する。
+        # on_progress(手, 値, 深さ, 局面数) は全ワーカーが深さを1つ読み切るごとに
+        # 呼ぶ。止められたら、それまでに全員が読み切った深さの結果を返す
+        executor = self.start()
+        self.idle.clear()
+        try:
+            stop = self.manager.Event()
+            progress = self.manager.Queue()
+            moves = [(x, y, stone) for x, y, stone, _ in engine.history]
+            weights = engine.evaluator.weights
+            slices = [root_moves[i :: self.workers] for i in range(self.workers)]
+            slices = [part for part in slices if part]
+            budget = None if max_nodes is None else max_nodes // len(slices)
+            futures = [
+                executor.submit(
+                    _search_slice,
+                    moves,
+                    weights,
+                    player,
+                    part,
+                    time_limit,
+                    max_depth,
+                    budget,
+                    stop,
+                    progress,
+                    index,
+                )
+                for index, part in enumerate(slices)
+            ]
+            results = [{} for _ in slices]
+            counts = [0] * len(slices)
+            reported = 0
+            pending = set(futures)
+            sign = 1 if player == WHITE else -1
+            while pending:
+                if self.closing.is_set() or (
+                    stop_event is not None and stop_event.is_set()
+                ):
+                    stop.set()
+                    for future in pending:
+                        future.cancel()
+                    break
+                _, pending = concurrent.futures.wait(pending, timeout=0.05)
+                while not progress.empty():
+                    index, depth, move, score, count = progress.get()
+                    results[index][depth] = (move, score)
+                    counts[index] = count
+                    if score * sign >= WIN_SCORE:
+                        stop.set()  # 勝ちが読めたので、ほかのワーカーも止める
+                move, score, depth = _combine(results, player)
+                if on_progress is not None and depth > reported:
+                    reported = depth
+                    on_progress(move, score, depth, sum(counts))
+            else:
+                outcomes = [future.result() for future in futures]
+                results = [r for r, _ in outcomes]
+                counts = [count for _, count in outcomes]
+            move, score, depth = _combine(results, player)
+            if move is None:
+                move = root_moves[0]
+            return move, score, depth, sum(counts)
+        finally:
+            self.idle.set()
+
+
+BENCH_POSITIONS = [
+    # 序盤
+    [(9, 9), (8, 10), (10, 10), (10, 8), (8, 8)],
+    # 中盤
+    [
+        (9, 9), (8, 10), (7, 9), (7, 10), (6, 10), (5, 11), (8, 9), (6, 9),
+        (9, 10), (8, 11), (9, 12), (9, 11), (10, 11), (7, 8),
+    ],
+]  # fmt: skip
+
+
+def benchmark(worker_counts, time_limit=2.0):
+    # ワーカー数ごとに同じ局面を読ませ、到達深さと局面数を比べる
+    rows = []
+    for workers in worker_counts:
+        searcher = ParallelSearcher(workers)
+        searcher.start().submit(os.getpid).result()  # 起動時間を測定から外す
+        depths = []
+        nodes = 0
+        for position in BENCH_POSITIONS:
+            engine = RenjuEngine()
+            for x, y in position:
+                engine.make_move(x, y)
+            player = engine.current_player
+            root_moves = engine.generate_moves(player, limit=ROOT_MOVES)
+            if player == BLACK:
+                root_moves = [m for m in root_moves if not engine.is_forbidden_move(*m)]
+            _, _, depth, count = searcher.search(engine, player, root_moves, time_limit)
+            depths.append(depth)
+            nodes += count
+        searcher.close()
+        rows.append((workers, sum(depths) / len(depths), nodes / time_limit / len(depths)))
+    base = rows[0][2] or 1
+    print("workers  depth  nodes/s  speedup")
+    for workers, depth, rate in rows:
+        print(f"{workers:7d}  {depth:5.1f}  {rate:7.0f}  {rate / base:6.2f}x")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="並列探索のワーカー数ごとの速度を測る")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="試すワーカー数",
+    )
+    parser.add_argument("--time", type=float, default=2.0, help="1局面の持ち時間（秒）")
+    args = parser.parse_args()
+    benchmark(args.workers, args.time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""11マス窓の並びから脅威の種類を引く事前計算テーブル。
+
+窓は中心マスを手番側の石とみなし、残り10マスを 空(0)/自石(1)/塞がり(2) の
+3進数で符号化する。``PATTERNS[TERN[own] + TERN2[blocked]]`` の1回の参照で
+``(種類, 四の数, 五になる点, 活四になる点)`` が得られる。点はどちらも窓の
+ビット位置（bit i が中心から i - WINDOW 離れたマス）で表したマスク。
+五は「ちょうど5連」のみで、6連以上は OVERLINE として区別する。
+"""
+
+import os
+import pickle
+
+from .board import CENTER_BIT, LEFT_RUN, RIGHT_RUN, SIDE_MASK, WINDOW, WINDOW_MASK
+
+NONE = 0
+OPEN_TWO = 1  # 打てば活三になる点がある
+THREE = 2  # 打てば四（止め四）になる点がある
+OPEN_THREE = 3  # 打てば活四になる点がある
+FOUR = 4  # 五になる点がある
+OPEN_FOUR = 5  # 五になる点が両側にある（達四）
+FIVE = 6
+OVERLINE = 7
+
+CELLS = 2 * WINDOW  # 中心以外のマス数
+TABLE_VERSION = 1
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "__pycache__", "renju_patterns.pickle"
+)
+
+
+def _tern(bits):
+    value = 0
+    for i in range(2 * WINDOW + 1):
+        if i != WINDOW and bits >> i & 1:
+            value += 3 ** (i if i < WINDOW else i - 1)
+    return value
+
+
+TERN = [_tern(bits) for bits in range(WINDOW_MASK + 1)]
+TERN2 = [2 * value for value in TERN]
+
+
+def _decode(index):
+    own = CENTER_BIT
+    blocked = 0
+    for k in range(CELLS):
+        index, digit = divmod(index, 3)
+        bit = 1 << (k if k < WINDOW else k + 1)
+        if digit == 1:
+            own |= bit
+        elif digit == 2:
+            blocked |= bit
+    return own, blocked
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
+
+
+def build_table():
+    table = [None] * 3**CELLS
+    interned = {}
+
+    def classify(own, blocked):
+        index = TERN[own] + TERN2[blocked]
+        entry = table[index]
+        if entry is not None:
+            return entry
+        run = 1 + LEFT_RUN[own & SIDE_MASK] + RIGHT_RUN[(own >> (WINDOW + 1)) & SIDE_MASK]
+        if run >= 6:
+            entry = (OVERLINE, 0, 0, 0)
+        elif run == 5:
+            entry = (FIVE, 0, 0, 0)
+        else:
+            fives = open_fours = 0
+            best = NONE
+            for bit in _bits(~(own | blocked) & WINDOW_MASK):
+                kind = classify(own | bit, blocked)[0]
+                if kind == FIVE:
+                    fives |= bit
+                elif kind == OPEN_FOUR:
+                    open_fours |= bit
+                elif kind < FIVE and kind > best:
+                    best = kind
+            if fives:
+                if any(bit << 5 & fives for bit in _bits(fives)):
+                    entry = (OPEN_FOUR, 1, fives, 0)
+                else:
+                    entry = (FOUR, min(bin(fives).count("1"), 2), fives, 0)
+            elif open_fours:
+                entry = (OPEN_THREE, 0, 0, open_fours)
+            elif best == FOUR:
+                entry = (THREE, 0, 0, 0)
+            elif best == OPEN_THREE:
+                entry = (OPEN_TWO, 0, 0, 0)
+            else:
+                entry = (NONE, 0, 0, 0)
+        entry = interned.setdefault(entry, entry)
+        table[index] = entry
+        return entry
+
+    for index in range(len(table)):
+        if table[index] is None:
+            classify(*_decode(index))
+    return table
+
+
+def load_table(path=CACHE_PATH):
+    try:
+        with open(path, "rb") as f:
+            version, table = pickle.load(f)
+        if version == TABLE_VERSION and len(table) == 3**CELLS:
+            return table
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        pass
+    table = build_table()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump((TABLE_VERSION, table), f, pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # キャッシュできなくても毎回作り直すだけ
+    return table
+
+
+PATTERNS = load_table()
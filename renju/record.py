@@ -0,0 +1,175 @@
+"""棋譜の読み書きと局面の再現。
+
+棋譜のテキストは PGN に似た形で、ヘッダー行のあとに手を空白区切りで並べる。
+手は列を a〜s、行を下から 1〜19 で書く（盤の中央は j10）。番号付きの
+"1." のような語は読み飛ばす。1つのファイルに空行で区切って何局でも書ける。
+
+    [Black "Human"]
+    [White "AI"]
+    [Result "0-1"]
+    j10 k9 k10 ...
+
+結果は "1-0"（黒の勝ち）/ "0-1"（白の勝ち）/ "1/2-1/2"（引き分け）/
+"*"（途中）。tournament の JSONL の棋譜もそのまま読める。
+"""
+
+import json
+import re
+
+from .board import BLACK, BOARD_SIZE, WHITE
+
+COLUMNS = "abcdefghijklmnopqrs"
+UNFINISHED = "*"
+RESULTS = {BLACK: "1-0", WHITE: "0-1", None: "1/2-1/2"}
+_HEADER = re.compile(r'\[(\w+)\s+"(.*)"\]')
+_MOVE = re.compile(r"([a-s])(\d{1,2})")
+
+
+def format_move(x, y, size=BOARD_SIZE):
+    return f"{COLUMNS[x]}{size - y}"
+
+
+def parse_move(text, size=BOARD_SIZE):
+    match = _MOVE.fullmatch(text.lower())
+    if match is None:
+        raise ValueError(f"手として読めません: {text!r}")
+    x = COLUMNS.index(match.group(1))
+    y = size - int(match.group(2))
+    if not (0 <= x < size and 0 <= y < size):
+        raise ValueError(f"盤の外の手です: {text!r}")
+    return x, y
+
+
+class GameRecord:
+    def __init__(self, moves=(), headers=None, size=BOARD_SIZE):
+        self.moves = [tuple(move) for move in moves]
+        self.headers = dict(headers or {})
+        self.size = size
+
+    @classmethod
+    def from_engine(cls, engine, **headers):
+        # 対局中・終局後のエンジンから。結果は終局していれば埋める
+        moves = [(x, y) for x, y, _, _ in engine.history]
+        record = cls(moves, headers, engine.board_size)
+        if "Result" not in record.headers:
+            if engine.game_over:
+                record.headers["Result"] = RESULTS[engine.winner]
+            else:
+                record.headers["Result"] = UNFINISHED
+        return record
+
+    @classmethod
+    def from_text(cls, text, size=BOARD_SIZE):
+        headers = {}
+        moves = []
+        for line in text.splitlines():
+            line = line.strip()
+            match = _HEADER.fullmatch(line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+                continue
+            for token in line.split():
+                if token.endswith(".") or token == UNFINISHED:
+                    continue
+                if token in RESULTS.values():
+                    continue
+                moves.append(parse_move(token, size))
+        return cls(moves, headers, size)
+
+    def to_text(self):
+        lines = [f'[{key} "{value}"]' for key, value in self.headers.items()]
+        lines.append(" ".join(format_move(x, y, self.size) for x, y in self.moves))
+        return "\n".join(lines) + "\n"
+
+    @property
+    def result(self):
+        return self.headers.get("Result", UNFINISHED)
+
+    @property
+    def winner(self):
+        # BLACK / WHITE。引き分け・途中なら None
+        for player in (BLACK, WHITE):
+            if self.result == RESULTS[player]:
+                return player
+        return None
+
+    def replay(self, engine=None, upto=None):
+        # upto 手目までを打った局面のエンジン。engine を渡せば、その局面から
+        # 共通の手順までだけ戻して打ち直すので、続けて別の局面を作るのが速い
+        if engine is None:
+            from .engine import RenjuEngine
+
+            engine = RenjuEngine(self.size)
+        moves = self.moves if upto is None else self.moves[:upto]
+        common = 0
+        for (x, y, _, _), move in zip(engine.history, moves):
+            if (x, y) != move:
+                break
+            common += 1
+        while len(engine.history) > common:
+            engine.undo()
+        for number, (x, y) in enumerate(moves[common:], common + 1):
+            if engine.game_over:
+                raise ValueError(f"{number}手目: 終局のあとの手です")
+            if not (0 <= x < self.size and 0 <= y < self.size):
+                raise ValueError(f"{number}手目 ({x}, {y}): 盤の外です")
+            if not engine.is_empty(x, y):
+                raise ValueError(
+                    f"{number}手目 {format_move(x, y, self.size)}: 石のあるマスです"
+                )
+            if engine.current_player == BLACK and engine.is_forbidden_move(x, y):
+                # 禁じ手で負けた対局（自己対局の棋譜）は、その手で白の勝ちとして終える
+                if number != len(self.moves) or self.winner != WHITE:
+                    raise ValueError(
+                        f"{number}手目 {format_move(x, y, self.size)}: 黒の禁じ手です"
+                    )
+                engine.make_move(x, y)
+                engine.game_over = True
+                engine.winner = WHITE
+                break
+            engine.make_move(x, y)
+        return engine
+
+    def positions(self, engine=None):
+        # 各手を打つ前の (エンジン, その手) を順に返す。エンジンは使い回す
+        engine = self.replay(engine, 0)
+        for x, y in self.moves:
+            yield engine, (x, y)
+            engine.make_move(x, y)
+
+
+def load_records(path, size=BOARD_SIZE):
+    # テキストの棋譜（空行区切りで複数局）か tournament の JSONL を読む
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".jsonl"):
+        records = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                game = json.loads(line)
+                winner = {game["black"]: BLACK, game["white"]: WHITE}.get(
+                    game["winner"]
+                )
+                headers = {
+                    "Black": game["black"],
+                    "White": game["white"],
+                    "Result": RESULTS[winner],
+                }
+                records.append(GameRecord(game["moves"], headers, size))
+            except (KeyError, TypeError, ValueError) as error:
+                raise ValueError(
+                    f"{path}:{number}: 棋譜として読めません ({error!r})"
+                ) from error
+        return records
+    return [
+        GameRecord.from_text(chunk, size)
+        for chunk in re.split(r"\n\s*\n", text)
+        if chunk.strip()
+    ]
+
+
+def save_records(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(record.to_text() for record in records))
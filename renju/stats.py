@@ -0,0 +1,107 @@
+import time
+
+# 時間を測る処理の区分
+SECTIONS = ("eval", "movegen", "rules", "threats")
+
+
+class SearchStats:
+    """1回の best_move の統計（局面数・深さ・β カット率・置換表の当たり率・
+    処理ごとの時間）。
+
+    RenjuEngine.enable_stats() で作られ、測りたいメソッドをインスタンス属性の
+    計時ラッパーで覆う。無効のときは元のメソッドがそのまま呼ばれるので探索に
+    余計な処理は入らない。時間は入れ子になった区間の分を差し引いた正味の値。
+    """
+
+    def __init__(self):
+        # ラッパーが辞書を掴んでいるので、reset では中身だけを書き換える
+        self.times = {}
+        self.calls = {}
+        self.reset()
+
+    def reset(self):
+        self.times.update(dict.fromkeys(SECTIONS, 0.0))
+        self.calls.update(dict.fromkeys(SECTIONS, 0))
+        self.cutoffs = 0
+        self.nodes = 0
+        self.depth = 0
+        self.source = None
+        self.tt_hits = 0
+        self.tt_probes = 0
+        self.elapsed = 0.0
+        self.start = time.perf_counter()
+        self._tt_start = (0, 0)
+        self._child = 0.0  # 実行中の区間の中で、さらに内側の区間が使った時間
+
+    def timed(self, section, func):
+        times = self.times
+        calls = self.calls
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            outer = self._child
+            self._child = 0.0
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                spent = clock() - start
+                times[section] += spent - self._child
+                calls[section] += 1
+                self._child = outer + spent
+
+        return wrapper
+
+    def counted(self, func):
+        # β カットを記録するメソッドに被せて回数を数える
+        def wrapper(*args):
+            self.cutoffs += 1
+            return func(*args)
+
+        return wrapper
+
+    def begin(self, engine):
+        self.reset()
+        self._tt_start = (engine.tt.hits, engine.tt.probes)
+
+    def finish(self, engine):
+        self.elapsed = time.perf_counter() - self.start
+        hits, probes = self._tt_start
+        self.tt_hits = engine.tt.hits - hits
+        self.tt_probes = engine.tt.probes - probes
+        info = engine.search_info
+        if info is not None:
+            self.nodes = info["nodes"]
+            self.depth = info["depth"]
+            self.source = info["source"]
+        else:
+            self.source = "immediate"
+
+    def report(self):
+        expanded = self.calls["movegen"]
+        return {
+            "nodes": self.nodes,
+            "depth": self.depth,
+            "source": self.source,
+            "time": self.elapsed,
+            "nps": self.nodes / self.elapsed if self.elapsed else 0.0,
+            "cutoffs": self.cutoffs,
+            "cutoff_ratio": self.cutoffs / expanded if expanded else 0.0,
+            "tt_probes": self.tt_probes,
+            "tt_hit_rate": self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            "times": dict(self.times),
+            "calls": dict(self.calls),
+        }
+
+    def summary(self):
+        report = self.report()
+        times = " ".join(
+            f"{section} {seconds * 1000:.0f}ms"
+            for section, seconds in report["times"].items()
+        )
+        return (
+            f"{report['source']} depth {report['depth']} "
+            f"nodes {report['nodes']} ({report['nps']:.0f}/s) "
+            f"cutoff {report['cutoff_ratio']:.0%} tt {report['tt_hit_rate']:.0%} "
+            f"time {report['time'] * 1000:.0f}ms [{times}]"
+        )
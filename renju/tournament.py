@@ -0,0 +1,242 @@
+"""評価の重みの組どうしを自己対局で戦わせる総当たり戦。
+
+重みの組は JSON で与える。組ごとに evaluation.DEFAULT_WEIGHTS と同じ形で、
+書かなかった項目は既定の値になる。"default" は常に加わる。
+
+    {"block-heavy": {"block": [0, 0, 0, 800, 12000, 40000, 80000, 0]},
+     "white-aggressive": {"attack_white": [0, 600, 2500, 9000, 16000, 32000, 100000, 0]}}
+
+序盤の数手をランダムに決めた開始局面を作り、同じ開始局面を先手・後手を
+入れ替えて2局ずつ打つ。対局はプロセスに分けて並列に打ち、組ごとの勝敗と
+ほかの組全体に対する Elo 差を報告する。
+
+    python -m renju.tournament --weights sets.json --games 200 --time 0.2 \\
+        --workers 8 --records games.jsonl --output results.json
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from .board import BLACK, WHITE
+from .engine import RenjuEngine
+from .evaluation import DEFAULT_WEIGHTS
+
+# 開始局面の石を置く範囲（中央からの距離）
+OPENING_RADIUS = 2
+
+
+def load_weight_sets(path=None):
+    sets = {"default": DEFAULT_WEIGHTS}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, weights in json.load(f).items():
+                sets[name] = {**DEFAULT_WEIGHTS, **weights}
+    return sets
+
+
+def random_opening(rng, plies, size=19):
+    # 中央付近にランダムに plies 手置いた開始局面（黒の禁じ手は避ける）
+    engine = RenjuEngine(size)
+    center = size // 2
+    cells = [
+        (x, y)
+        for x in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1)
+        for y in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1)
+    ]
+    moves = [(center, center)]
+    engine.make_move(center, center)
+    while len(moves) < plies:
+        x, y = rng.choice(cells)
+        if not engine.is_empty(x, y):
+            continue
+        if engine.current_player == BLACK and engine.is_forbidden_move(x, y):
+            continue
+        engine.make_move(x, y)
+        moves.append((x, y))
+    return moves
+
+
+def play_game(task):
+    # 1局打って結果と棋譜を返す。プロセスプールから呼ばれる
+    names = {BLACK: task["black"], WHITE: task["white"]}
+    engines = {
+        player: RenjuEngine(weights=task["weights"][player]) for player in names
+    }
+    for engine in engines.values():
+        engine.book = None
+    referee = engines[BLACK]
+    moves = [tuple(move) for move in task["opening"]]
+    for x, y in moves:
+        for engine in engines.values():
+            engine.make_move(x, y)
+    start = time.perf_counter()
+    winner = None
+    reason = "draw"
+    while True:
+        player = referee.current_player
+        x, y = engines[player].best_move(
+            time_limit=task["time"], max_nodes=task["nodes"]
+        )
+        moves.append((x, y))
+        if player == BLACK and referee.is_forbidden_move(x, y):
+            winner, reason = WHITE, referee.forbidden_reason(x, y)
+            break
+        for engine in engines.values():
+            result = engine.make_move(x, y)
+        if result == "win":
+            winner, reason = player, "five"
+            break
+        if result == "draw":
+            break
+    return {
+        "game": task["game"],
+        "black": names[BLACK],
+        "white": names[WHITE],
+        "winner": names.get(winner),
+        "reason": reason,
+        "moves": [list(move) for move in moves],
+        "time": time.perf_counter() - start,
+    }
+
+
+def make_tasks(sets, games, time_limit, max_nodes, opening_plies, seed):
+    # 組の各ペアについて games 局。開始局面ごとに先後を入れ替えて2局
+    rng = random.Random(seed)
+    tasks = []
+    for first, second in itertools.combinations(sets, 2):
+        for i in range(games):
+            if i % 2 == 0:
+                opening = random_opening(rng, opening_plies)
+            black, white = (first, second) if i % 2 == 0 else (second, first)
+            tasks.append(
+                {
+                    "game": len(tasks),
+                    "black": black,
+                    "white": white,
+                    "weights": {BLACK: sets[black], WHITE: sets[white]},
+                    "opening": opening,
+                    "time": time_limit,
+                    "nodes": max_nodes,
+                }
+            )
+    return tasks
+
+
+def elo(wins, losses, draws):
+    # 勝ち・負け・引き分けの数からの Elo 差と、その 95% の幅
+    games = wins + losses + draws
+    if not games:
+        return 0.0, float("inf")
+    score = (wins + 0.5 * draws) / games
+    variance = (
+        wins * (1 - score) ** 2 + losses * score**2 + draws * (0.5 - score) ** 2
+    ) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def to_elo(p):
+        p = min(max(p, 1e-6), 1 - 1e-6)
+        return 400 * math.log10(p / (1 - p))
+
+    return to_elo(score), (to_elo(score + margin) - to_elo(score - margin)) / 2
+
+
+def standings(sets, results):
+    table = {name: [0, 0, 0] for name in sets}  # 勝ち, 負け, 引き分け
+    for result in results:
+        players = (result["black"], result["white"])
+        if result["winner"] is None:
+            for name in players:
+                table[name][2] += 1
+        else:
+            for name in players:
+                table[name][0 if name == result["winner"] else 1] += 1
+    rows = []
+    for name, (wins, losses, draws) in table.items():
+        diff, margin = elo(wins, losses, draws)
+        rows.append(
+            {
+                "name": name,
+                "wins": wins,
+                "losses": losses,
+                "draws": draws,
+                "elo": diff,
+                "margin": margin,
+            }
+        )
+    return sorted(rows, key=lambda row: row["elo"], reverse=True)
+
+
+def run(sets, games, time_limit, max_nodes, workers, opening_plies, seed, records):
+    tasks = make_tasks(sets, games, time_limit, max_nodes, opening_plies, seed)
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_game, task) for task in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if records is not None:
+                records.write(json.dumps(result) + "\n")
+                records.flush()
+            winner = result["winner"] or "draw"
+            print(
+                f"[{len(results)}/{len(tasks)}] {result['black']} - "
+                f"{result['white']}: {winner} ({result['reason']}, "
+                f"{len(result['moves'])} moves)",
+                file=sys.stderr,
+            )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="重みの組どうしの自己対局")
+    parser.add_argument("--weights", help="重みの組の JSON ファイル")
+    parser.add_argument("--games", type=int, default=20, help="1ペアあたりの対局数")
+    parser.add_argument("--time", type=float, default=0.2, help="1手の持ち時間（秒）")
+    parser.add_argument("--nodes", type=int, default=None, help="1手の局面数の上限")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="並列に打つ対局数"
+    )
+    parser.add_argument("--opening-plies", type=int, default=3, help="開始局面の手数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--records", help="棋譜を1局1行で追記する JSONL ファイル")
+    parser.add_argument("--output", help="順位表と全局の結果を書き出す JSON ファイル")
+    args = parser.parse_args(argv)
+    sets = load_weight_sets(args.weights)
+    if len(sets) < 2:
+        parser.error("--weights で default 以外の重みの組を1つ以上与えてください")
+    records = open(args.records, "a", encoding="utf-8") if args.records else None
+    try:
+        results = run(
+            sets,
+            args.games,
+            args.time,
+            args.nodes,
+            args.workers,
+            args.opening_plies,
+            args.seed,
+            records,
+        )
+    finally:
+        if records is not None:
+            records.close()
+    table = standings(sets, results)
+    print(f"{'name':<20} {'W':>5} {'L':>5} {'D':>5} {'Elo':>12}")
+    for row in table:
+        print(
+            f"{row['name']:<20} {row['wins']:5d} {row['losses']:5d} {row['draws']:5d} "
+            f"{row['elo']:+6.0f} ±{row['margin']:.0f}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"sets": sets, "standings": table, "games": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+EXACT = 0
+LOWER = 1  # 値は少なくともこれ以上（beta カット）
+UPPER = 2  # 値は多くともこれ以下（alpha を超えなかった）
+
+
+class TranspositionTable:
+    """Zobrist キーで引く固定サイズの置換表。
+
+    エントリは (キー, 深さ, 種類, 値, 最善手, 世代) のタプルで、キーの下位
+    ビットで決まる1スロットに置く。同じ局面か、前回以前の探索（世代が古い）
+    か、新しい方が深さ以上のときだけ上書きする。
+    """
+
+    def __init__(self, size_bits=20):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = key & self.mask
+        old = self.entries[index]
+        if (
+            old is None
+            or old[0] == key
+            or old[5] != self.generation
+            or depth >= old[1]
+        ):
+            self.entries[index] = (key, depth, flag, score, move, self.generation)
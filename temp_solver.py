@@ -1,47 +1,503 @@
-from itertools import product
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
 
-row_hints=[[6],[1,1],[1,1,1,1],[1,1,1,1],[1,1],[1,4,1],[1,1],[1,1,1,1],[1,1],[6]]
-col_hints=[[6],[1,1],[1,1,1,1],[1,1,1,1],[1,1,1],[1,1,1],[1,1,1,1],[1,1,1,1],[1,1],[6]]
+row_hints = [[6], [1, 1], [1, 1, 1, 1], [1, 1, 1, 1], [1, 1], [1, 4, 1], [1, 1], [1, 1, 1, 1], [1, 1], [6]]
+col_hints = [[6], [1, 1], [1, 1, 1, 1], [1, 1, 1, 1], [1, 1, 1], [1, 1, 1], [1, 1, 1, 1], [1, 1, 1, 1], [1, 1], [6]]
 
-n=len(row_hints)
+UNKNOWN = -1
+EMPTY = 0
+FILLED = 1
+# 行・列を解いた結果のキャッシュの上限。超えたら捨てて作り直す
+LINE_CACHE_LIMIT = 1 << 18
 
 
-def fits(line, hints):
-    blocks=[]
-    count=0
+def blocks_of(hints):
+    # [0] は何も塗らない列
+    return [b for b in hints if b]
+
+
+def line_masks(line):
+    # 列を (塗りのマス, 空白のマス) のビットマスクに。x 番目のマスがビット x
+    filled = empty = 0
+    for x, cell in enumerate(line):
+        if cell == FILLED:
+            filled |= 1 << x
+        elif cell == EMPTY:
+            empty |= 1 << x
+    return filled, empty
+
+
+def mask_line(mask, n):
+    return [mask >> x & 1 for x in range(n)]
+
+
+def _tails(blocks):
+    # tail[j]: blocks[j:] を1マスずつ空けて詰めたときの長さ
+    tail = [0] * (len(blocks) + 1)
+    for j in range(len(blocks) - 1, -1, -1):
+        tail[j] = blocks[j] + tail[j + 1] + (j + 1 < len(blocks))
+    return tail
+
+
+def placements(hints, n, filled=0, empty=0):
+    # 手がかりに合う並べ方を塗るマスのビットマスクで1つずつ返す。
+    # filled / empty のマスが塗り / 空白になる並べ方だけを作るので、
+    # 手間は 2^n ではなく合う並べ方の数に比例する
+    blocks = blocks_of(hints)
+    k = len(blocks)
+    tail = _tails(blocks)
+
+    def place(j, start, mask):
+        if j == k:
+            if not filled >> start:
+                yield mask
+            return
+        b = blocks[j]
+        run = (1 << b) - 1
+        for p in range(start, n - tail[j] + 1):
+            if filled >> start & ((1 << (p - start)) - 1):
+                break  # 塗りのマスを飛ばしてしまう
+            block = run << p
+            if block & empty or filled >> (p + b) & 1:
+                continue
+            yield from place(j + 1, p + b + 1, mask | block)
+
+    return place(0, 0, 0)
+
+
+def count_placements(hints, n, filled=0, empty=0):
+    # placements の数を並べずに数える
+    blocks = blocks_of(hints)
+    k = len(blocks)
+    # count[s]: マス s 以降に blocks[j:] を並べる方法の数（j を後ろから）
+    count = [int(not filled >> s) for s in range(n + 2)]
+    for j in range(k - 1, -1, -1):
+        b = blocks[j]
+        run = (1 << b) - 1
+        nxt = count
+        count = [0] * (n + 2)
+        for s in range(n - 1, -1, -1):
+            if not filled >> s & 1:
+                count[s] = count[s + 1]
+            if (
+                s + b <= n
+                and not (run << s) & empty
+                and not filled >> (s + b) & 1
+            ):
+                count[s] += nxt[min(s + b + 1, n + 1)]
+    return count[0]
+
+
+def solve_line(hints, line):
+    # 手がかりと今わかっているマスから、どう並べても同じになるマスを決める。
+    # 新しい列を返す。どう並べても手がかりに合わなければ None
+    blocks = blocks_of(hints)
+    n = len(line)
+    k = len(blocks)
+    # filled[i] / empty[i]: line[:i] の塗り / 空白の数
+    filled = [0] * (n + 1)
+    empty = [0] * (n + 1)
+    for i, cell in enumerate(line):
+        filled[i + 1] = filled[i] + (cell == FILLED)
+        empty[i + 1] = empty[i] + (cell == EMPTY)
+
+    def can_place(i, b):
+        # i から長さ b のブロックを置き、そのすぐ後ろを空白にできるか
+        end = i + b
+        if end > n or empty[end] != empty[i]:
+            return False
+        return end == n or line[end] != FILLED
+
+    # ok[j][i]: line[i:] に blocks[j:] を並べられるか
+    ok = [[False] * (n + 2) for _ in range(k + 1)]
+    for i in range(n + 1):
+        ok[k][i] = filled[n] == filled[i]
+    ok[k][n + 1] = True
+    for j in range(k - 1, -1, -1):
+        b = blocks[j]
+        for i in range(n - 1, -1, -1):
+            ok[j][i] = (line[i] != FILLED and ok[j][i + 1]) or (
+                can_place(i, b) and ok[j + 1][min(i + b + 1, n + 1)]
+            )
+    if not ok[0][0]:
+        return None
+
+    # 先頭から、解につながる並べ方だけをたどって塗れる・空けられるマスを集める
+    can_fill = [False] * n
+    can_empty = [False] * n
+    reach = [[False] * (n + 2) for _ in range(k + 1)]
+    reach[0][0] = True
+    for i in range(n + 1):
+        for j in range(k + 1):
+            if not reach[j][i] or not ok[j][i]:
+                continue
+            if j == k:
+                for c in range(i, n):
+                    can_empty[c] = True
+                continue
+            if i < n and line[i] != FILLED and ok[j][i + 1]:
+                can_empty[i] = True
+                reach[j][i + 1] = True
+            b = blocks[j]
+            nxt = min(i + b + 1, n + 1)
+            if can_place(i, b) and ok[j + 1][nxt]:
+                for c in range(i, i + b):
+                    can_fill[c] = True
+                if i + b < n:
+                    can_empty[i + b] = True
+                reach[j + 1][nxt] = True
+    return [
+        UNKNOWN if f and e else FILLED if f else EMPTY
+        for f, e in zip(can_fill, can_empty)
+    ]
+
+
+def propagate(grid, row_hints, col_hints, dirty, cache=None):
+    # 行と列を交互に解いて、決まるマスがなくなるまで繰り返す。
+    # dirty は解き直す (0, 行番号) / (1, 列番号) の集合。矛盾すれば False。
+    # cache を渡せば (0 か 1, 番号, 列の中身) -> 解いた結果 を覚えて使い回す
+    height = len(row_hints)
+    width = len(col_hints)
+
+    def solve_cached(axis, index, hints, line):
+        if cache is None:
+            return solve_line(hints, line)
+        key = (axis, index, tuple(line))
+        if key not in cache:
+            if len(cache) >= LINE_CACHE_LIMIT:
+                cache.clear()
+            cache[key] = solve_line(hints, line)
+        return cache[key]
+
+    while dirty:
+        axis, index = dirty.pop()
+        if axis == 0:
+            line = grid[index]
+            solved = solve_cached(0, index, row_hints[index], line)
+            if solved is None:
+                return False
+            for x in range(width):
+                if solved[x] != line[x]:
+                    line[x] = solved[x]
+                    dirty.add((1, x))
+        else:
+            line = [grid[y][index] for y in range(height)]
+            solved = solve_cached(1, index, col_hints[index], line)
+            if solved is None:
+                return False
+            for y in range(height):
+                if solved[y] != line[y]:
+                    grid[y][index] = solved[y]
+                    dirty.add((0, y))
+    return True
+
+
+def _search(row_hints, col_hints):
+    # 解を見つけるたびに盤（行のリストのリスト）をそのまま返す。返した盤は
+    # 次の解を探すときに書き換わることがあるので、残すなら複製する
+    height = len(row_hints)
+    width = len(col_hints)
+    # 探索の枝どうしで同じ行・列の状態を何度も解くので、結果を使い回す
+    cache = {}
+
+    def search(grid, dirty):
+        if not propagate(grid, row_hints, col_hints, dirty, cache):
+            return
+        rows = [y for y in range(height) if UNKNOWN in grid[y]]
+        if not rows:
+            yield grid
+            return
+        # 行き詰まったら、決まっていない行のうち一番上と一番下の、並べ方の
+        # 少ない方を並べ方ごとに試す。行を端から決めていくと、列は端から
+        # 順に埋まるので、合わない並べ方は置いた直後の列の伝播で落ちる
+        masks = {y: line_masks(grid[y]) for y in (rows[0], rows[-1])}
+        y = min(masks, key=lambda y: count_placements(row_hints[y], width, *masks[y]))
+        unknown = {(1, x) for x in range(width) if grid[y][x] == UNKNOWN}
+        for mask in placements(row_hints[y], width, *masks[y]):
+            branch = [line[:] for line in grid]
+            branch[y] = mask_line(mask, width)
+            yield from search(branch, set(unknown))
+
+    grid = [[UNKNOWN] * width for _ in range(height)]
+    dirty = {(0, y) for y in range(height)} | {(1, x) for x in range(width)}
+    return search(grid, dirty)
+
+
+def iter_solutions(row_hints, col_hints):
+    # 解（0/1 の行のタプルのタプル）を見つけた順に1つずつ返す
+    for grid in _search(row_hints, col_hints):
+        yield tuple(tuple(row) for row in grid)
+
+
+def solve(row_hints, col_hints):
+    # すべての解のリスト
+    return list(iter_solutions(row_hints, col_hints))
+
+
+def count_solutions(row_hints, col_hints, limit=None):
+    # 解の数。盤は残さない。limit 個見つけたらそこで止める
+    count = 0
+    for _ in _search(row_hints, col_hints):
+        count += 1
+        if count == limit:
+            break
+    return count
+
+
+def is_unique(row_hints, col_hints):
+    # 解がちょうど1つか。2つ目が見つかった時点で止める
+    return count_solutions(row_hints, col_hints, limit=2) == 1
+
+
+def parse_text(text, name="puzzle"):
+    # テキストの問題集。"name 名前" で問題を始め、"rows" / "cols" の行の
+    # あとに1行1つずつ手がかりを空白区切りで書く（何も塗らない列は 0）。
+    # rows と cols はどちらが先でもよく、同じ見出しがもう一度出てきたら次の
+    # 問題とみなす。空行と # から後ろは読み飛ばす。name がなければ番号を付ける
+    puzzles = []
+    puzzle = section = None
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        word = line.split()[0]
+        if word == "name" or (word in ("rows", "cols") and puzzle and puzzle[word]):
+            puzzle = section = None
+        if puzzle is None:
+            puzzle = {"name": f"{name}#{len(puzzles) + 1}", "rows": [], "cols": []}
+            puzzles.append(puzzle)
+        if word == "name":
+            puzzle["name"] = line[4:].strip() or puzzle["name"]
+        elif word in ("rows", "cols"):
+            section = word
+        elif section is None:
+            raise ValueError(f"{name}:{number}: rows / cols の前に手がかりがあります")
+        else:
+            try:
+                puzzle[section].append([int(value) for value in line.split()])
+            except ValueError:
+                raise ValueError(f"{name}:{number}: 手がかりは数字で書きます") from None
+    return puzzles
+
+
+def check_puzzle(puzzle):
+    # 手がかりが盤に収まり、行と列で塗るマスの数が合うか。合わなければ
+    # ValueError（解いても解がないと分かるだけなので先に弾く）
+    rows, cols = puzzle["rows"], puzzle["cols"]
+    if not (isinstance(rows, list) and isinstance(cols, list) and rows and cols):
+        raise ValueError("rows と cols の両方が要ります")
+    for kind, hints, n in (("rows", rows, len(cols)), ("cols", cols, len(rows))):
+        for i, line in enumerate(hints, 1):
+            if not isinstance(line, list) or not all(
+                isinstance(b, int) and b >= 0 for b in line
+            ):
+                raise ValueError(f"{kind} {i}: 手がかりは 0 以上の整数の並びです")
+            blocks = blocks_of(line)
+            if sum(blocks) + len(blocks) - 1 > n:
+                raise ValueError(f"{kind} {i}: {line} が長さ {n} に収まりません")
+    filled = sum(map(sum, rows)), sum(map(sum, cols))
+    if filled[0] != filled[1]:
+        raise ValueError(f"塗るマスの数が行 ({filled[0]}) と列 ({filled[1]}) で違います")
+
+
+def _hints_of(line):
+    hints = []
+    run = 0
     for cell in line:
         if cell:
-            count+=1
+            run += 1
+        elif run:
+            hints.append(run)
+            run = 0
+    if run:
+        hints.append(run)
+    return hints or [0]
+
+
+def parse_json(data, name="puzzle"):
+    # {"name": ..., "rows": [...], "cols": [...]} か、その並び。手がかりの
+    # 代わりに illust-logic と同じ "grid"（0/1 の行の並び）でもよい
+    if isinstance(data, dict):
+        data = data.get("puzzles", [data])
+    if not isinstance(data, list):
+        raise ValueError(f"{name}: 問題の並びがありません")
+    puzzles = []
+    for i, item in enumerate(data, 1):
+        try:
+            puzzle = {"name": item.get("name", f"{name}#{i}")}
+            if "grid" in item:
+                grid = item["grid"]
+                if len({len(row) for row in grid}) > 1:
+                    raise ValueError("grid の行の長さがそろっていません")
+                puzzle["rows"] = [_hints_of(row) for row in grid]
+                puzzle["cols"] = [_hints_of(column) for column in zip(*grid)]
+            else:
+                puzzle["rows"] = item["rows"]
+                puzzle["cols"] = item["cols"]
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"{name}: {i} 問目を読めません ({error!r})") from error
+        puzzles.append(puzzle)
+    return puzzles
+
+
+def puzzle_files(path, skip=()):
+    # path がディレクトリなら中の .json と .txt を名前順に。skip のファイルは除く
+    if not os.path.isdir(path):
+        return [path]
+    skip = {os.path.abspath(p) for p in skip}
+    files = []
+    for entry in sorted(os.listdir(path)):
+        file = os.path.join(path, entry)
+        if entry.endswith((".json", ".txt")) and os.path.abspath(file) not in skip:
+            files.append(file)
+    return files
+
+
+def load_puzzles(path):
+    # ファイルかディレクトリ（中の .json と .txt をすべて）から問題を読む
+    if os.path.isdir(path):
+        puzzles = []
+        for file in puzzle_files(path):
+            puzzles.extend(load_puzzles(file))
+        return puzzles
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            puzzles = parse_json(json.load(f), name)
         else:
-            if count:
-                blocks.append(count)
-                count=0
-    if count:
-        blocks.append(count)
-    if not blocks:
-        blocks=[0]
-    return blocks==hints
-
-row_options=[]
-for hints in row_hints:
-    opts=[]
-    for mask in product([0,1], repeat=n):
-        if fits(mask,hints):
-            opts.append(mask)
-    row_options.append(opts)
-
-solutions=[]
-for rows in product(*row_options):
-    valid=True
-    for col_idx, hints in enumerate(col_hints):
-        column=[rows[r][col_idx] for r in range(n)]
-        if not fits(column, hints):
-            valid=False
-            break
-    if valid:
-        solutions.append(rows)
+            puzzles = parse_text(f.read(), name)
+    for puzzle in puzzles:
+        puzzle["file"] = path
+    return puzzles
+
+
+def solve_puzzle(puzzle, limit=2):
+    # 1問解いて結果を返す。プロセスプールから呼ばれる。解は limit 個まで
+    # 数え（None なら全部）、最初の解を "#" と "." の行で残す。手がかりが
+    # おかしい問題は止めずに "error" に理由を入れて返す
+    start = time.perf_counter()
+    count = 0
+    first = None
+    error = None
+    try:
+        check_puzzle(puzzle)
+        for grid in _search(puzzle["rows"], puzzle["cols"]):
+            if first is None:
+                first = ["".join("#" if c else "." for c in row) for row in grid]
+            count += 1
+            if count == limit:
+                break
+    except ValueError as e:
+        error = str(e)
+    return _result(puzzle, count, first, time.perf_counter() - start, error)
+
+
+def _result(puzzle, count=0, first=None, elapsed=0.0, error=None):
+    def size(hints):
+        return len(hints) if isinstance(hints, list) else 0
+
+    return {
+        "name": puzzle["name"],
+        "file": puzzle.get("file"),
+        "width": size(puzzle["cols"]),
+        "height": size(puzzle["rows"]),
+        "solutions": count,
+        "unique": count == 1,
+        "time": elapsed,
+        "solution": first,
+        "error": error,
+    }
+
+
+def solve_all(puzzles, limit=2, workers=None):
+    # 問題をプロセスに分けて解き、終わった順に結果を返す
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(solve_puzzle, puzzle, limit): i
+            for i, puzzle in enumerate(puzzles)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result()
+            except Exception as error:
+                # ワーカーが落ちても残りの問題は続ける
+                yield index, _result(puzzles[index], error=repr(error))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ノノグラム（イラストロジック）を解く")
+    parser.add_argument(
+        "paths", nargs="*", help="問題のファイル（.txt / .json）かディレクトリ"
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=2,
+        help="数える解の数の上限。2 なら一意かどうかだけ調べる。0 で全部数える",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="並列に解く問題の数"
+    )
+    parser.add_argument("--output", help="全問の解と時間を書き出す JSON ファイル")
+    parser.add_argument("--show", action="store_true", help="解いた盤を表示する")
+    args = parser.parse_args(argv)
+    limit = args.limit or None
+    if not args.paths:
+        # 問題を渡さなければ、このファイルの先頭の問題の解をすべて数える
+        sample = {"name": "sample", "rows": row_hints, "cols": col_hints}
+        result = solve_puzzle(sample, None)
+        print("solutions", result["solutions"])
+        for row in result["solution"] or ():
+            print(row)
+        return
+    puzzles = []
+    failed = 0
+    skip = [args.output] if args.output else []
+    for path in args.paths:
+        # ディレクトリの中の書き出し先（前回の結果）は問題として読まない
+        for file in puzzle_files(path, skip):
+            try:
+                puzzles.extend(load_puzzles(file))
+            except (OSError, ValueError) as error:
+                print(f"{file}: {error}", file=sys.stderr)
+                failed += 1
+    results = [None] * len(puzzles)
+    start = time.perf_counter()
+    for done, (index, result) in enumerate(solve_all(puzzles, limit, args.workers), 1):
+        results[index] = result
+        if result["error"] is not None:
+            verdict = f"error: {result['error']}"
+        elif result["solutions"] == 0:
+            verdict = "no solution"
+        elif result["unique"]:
+            verdict = "unique"
+        elif result["solutions"] == limit:
+            verdict = f"{limit}+ solutions"
+        else:
+            verdict = f"{result['solutions']} solutions"
+        print(
+            f"[{done}/{len(puzzles)}] {result['name']} "
+            f"({result['width']}x{result['height']}): {verdict}, "
+            f"{result['time']:.3f}s",
+            file=sys.stderr,
+        )
+        if args.show and result["solution"]:
+            print("\n".join(result["solution"]) + "\n", file=sys.stderr)
+    errors = sum(result["error"] is not None for result in results)
+    print(
+        f"{len(puzzles)} puzzles in {time.perf_counter() - start:.2f}s: "
+        f"{sum(result['unique'] for result in results)} unique, {errors} errors"
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 1 if failed or errors else 0
+
 
-print('solutions', len(solutions))
-if solutions:
-    for r in solutions[0]:
-        print(''.join('#' if c else '.' for c in r))
+if __name__ == "__main__":
+    sys.exit(main())